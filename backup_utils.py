@@ -4,10 +4,158 @@ Backup utilities for DevBox applications.
 Provides configurable backup functionality for different directories and use cases.
 """
 
+import fcntl
+import fnmatch
+import functools
+import hashlib
+import os
 import subprocess
+import shutil
+import signal
+import stat
 import sys
+import threading
 import atexit
 
+from config import ROOT_BACKUP_FILE, LEGACY_ROOT_BACKUP_FILE, ROOT_BACKUP_EXCLUDES
+
+# Leading bytes of zstd frames and gzip members
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Kernel buffer for the tar -> compressor pipe (default is 64 KiB)
+BACKUP_PIPE_SIZE = 2 << 20
+
+# Warm containers serve several launches, so backup state is per process:
+# one lock per backup file serialises backups and restores of it, and one
+# periodic worker per registered backup is reused by later launches
+_backup_locks = {}
+_backup_workers = {}
+
+
+def _backup_lock(backup_file):
+    """Get the lock guarding backup_file and its .partial/.fingerprint files."""
+    return _backup_locks.setdefault(backup_file, threading.Lock())
+
+
+def _grow_pipe(pipe):
+    """Enlarge a pipe's kernel buffer to BACKUP_PIPE_SIZE where Linux allows it."""
+    try:
+        fcntl.fcntl(pipe.fileno(), getattr(fcntl, "F_SETPIPE_SZ", 1031), BACKUP_PIPE_SIZE)
+    except OSError:
+        pass  # Above /proc/sys/fs/pipe-max-size; the default buffer still works
+
+
+def get_compress_command():
+    """
+    Get the compressor command for backups.
+
+    Backups are always multi-threaded zstd, matching their .tar.zst names;
+    zstd is part of CORE_DEV_PACKAGES, so every image has it. gzip is only
+    still read, for restoring legacy .tar.gz archives.
+
+    Returns:
+        list: Compressor argv that filters stdin to stdout
+
+    Raises:
+        RuntimeError: If zstd is not installed
+    """
+    if not shutil.which("zstd"):
+        raise RuntimeError("zstd is not installed")
+    return ["zstd", "-T0", "-3", "-q"]
+
+
+def is_excluded(relpath, exclude_patterns):
+    """
+    Approximate tar's --exclude matching for a path inside the backup.
+
+    Args:
+        relpath: Path relative to the backed-up directory
+        exclude_patterns: tar exclude patterns; "./" ones are anchored
+
+    Returns:
+        bool: True if tar would leave the path out
+    """
+    member = "./" + relpath
+    name = os.path.basename(relpath)
+    return any(
+        fnmatch.fnmatchcase(member if pattern.startswith("./") else name, pattern)
+        for pattern in exclude_patterns
+    )
+
+
+def _st_dev(path):
+    """Get the device of path without following symlinks; None if it is gone."""
+    try:
+        return os.lstat(path).st_dev
+    except FileNotFoundError:
+        return None
+
+
+def tree_fingerprint(source_dir, exclude_patterns=()):
+    """
+    Fingerprint a directory tree from metadata alone.
+
+    Hashes every entry's relative path, mode, size and mtime, staying on
+    source_dir's filesystem and skipping excluded paths like the backup tar
+    does. Reading contents is unnecessary: any edit, add, delete or rename
+    changes the metadata.
+
+    Args:
+        source_dir: Root of the tree
+        exclude_patterns: tar exclude patterns to leave out
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    root_dev = os.lstat(source_dir).st_dev
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        reldir = os.path.relpath(dirpath, source_dir)
+        # Don't descend into excluded dirs or other filesystems, like
+        # tar --one-file-system; dirs deleted mid-walk are dropped
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not is_excluded(os.path.normpath(os.path.join(reldir, d)), exclude_patterns)
+            and _st_dev(os.path.join(dirpath, d)) == root_dev
+        )
+        filenames = sorted(
+            f for f in filenames
+            if not is_excluded(os.path.normpath(os.path.join(reldir, f)), exclude_patterns)
+        )
+        for name in filenames + dirnames:
+            relpath = os.path.normpath(os.path.join(reldir, name))
+            try:
+                st = os.lstat(os.path.join(dirpath, name))
+            except FileNotFoundError:
+                continue
+            # Whole-second mtimes (all tar stores) and no directory sizes, so a
+            # freshly restored tree matches the fingerprint it was archived with
+            size = 0 if stat.S_ISDIR(st.st_mode) else st.st_size
+            digest.update(f"{relpath}\0{st.st_mode}\0{size}\0{int(st.st_mtime)}\n".encode())
+    return digest.hexdigest()
+
+
+def get_decompress_commands(backup_file):
+    """
+    Pick the integrity-test and decompress commands for an archive.
+
+    Args:
+        backup_file: Path to a compressed tar archive
+
+    Returns:
+        tuple: (test argv, decompress-to-stdout argv), or None if no
+        matching tool is installed
+    """
+    with open(backup_file, "rb") as f:
+        magic = f.read(4)
+    if magic == ZSTD_MAGIC and shutil.which("zstd"):
+        return ["zstd", "-tq", backup_file], ["zstd", "-dcq", backup_file]
+    if magic[:2] == GZIP_MAGIC:
+        gzip = "pigz" if shutil.which("pigz") else "gzip"
+        return [gzip, "-t", backup_file], [gzip, "-dc", backup_file]
+    return None
+
 
 def create_backup(source_dir="/root", backup_file=None, exclude_patterns=None):
     """
@@ -20,26 +168,74 @@ def create_backup(source_dir="/root", backup_file=None, exclude_patterns=None):
     """
     if backup_file is None:
         if source_dir == "/root":
-            backup_file = "/data/root_full_backup.tar.gz"
-        elif "unsloth" in source_dir:
-            backup_file = "/data/llama_backup.tar.gz"
+            backup_file = ROOT_BACKUP_FILE
         else:
-            backup_file = f"/data/{source_dir.replace('/', '_')}_backup.tar.gz"
+            backup_file = f"/data/{source_dir.replace('/', '_')}_backup.tar.zst"
     
     if exclude_patterns is None:
-        exclude_patterns = ["lost+found"]  # System directory
-    
+        if source_dir == "/root":
+            exclude_patterns = ROOT_BACKUP_EXCLUDES
+        else:
+            exclude_patterns = ["lost+found"]  # System directory
+
+    # Periodic and exit backups share the .partial file; never run two at once
+    with _backup_lock(backup_file):
+        return _write_backup(source_dir, backup_file, exclude_patterns)
+
+
+def _write_backup(source_dir, backup_file, exclude_patterns):
+    """Archive source_dir into backup_file; create_backup holds the file's lock."""
     try:
+        # Skip the archive entirely when nothing changed since the last backup
+        # (tar restores mtimes, so an untouched session fingerprints the same)
+        fingerprint = tree_fingerprint(source_dir, exclude_patterns)
+        fingerprint_file = backup_file + ".fingerprint"
+        try:
+            with open(fingerprint_file) as f:
+                unchanged = f.read().strip() == fingerprint and os.path.exists(backup_file)
+        except FileNotFoundError:
+            unchanged = False
+        if unchanged:
+            print(f"No changes in {source_dir} since the last backup, keeping {backup_file}", file=sys.stderr)
+            return backup_file
+
         print(f"Creating backup of {source_dir}...", file=sys.stderr)
         
-        # Build tar command
-        tar_cmd = ["tar", "-czf", backup_file]
+        # Build tar command; the archive goes to stdout in 1 MiB records.
+        # --one-file-system skips volume dirs bind-mounted into the tree; they
+        # already live on /data.
+        tar_cmd = ["tar", "--record-size=1M", "--one-file-system", "-cf", "-"]
         for pattern in exclude_patterns:
             tar_cmd.extend(["--exclude", pattern])
         tar_cmd.extend(["-C", source_dir, "."])
         
-        # Execute backup
-        subprocess.run(tar_cmd, check=True, capture_output=True)
+        # tar | compressor, with the compressor writing straight to the volume.
+        # The new backup only replaces the previous one once it is complete.
+        compress_cmd = get_compress_command()
+        partial_file = backup_file + ".partial"
+        with open(partial_file, "wb") as out:
+            tar = subprocess.Popen(tar_cmd, stdout=subprocess.PIPE)
+            _grow_pipe(tar.stdout)
+            compressor = subprocess.Popen(compress_cmd, stdin=tar.stdout, stdout=out)
+            tar.stdout.close()  # The compressor owns the read end now
+            compress_status = compressor.wait()
+            tar_status = tar.wait()
+        # tar exits 1 when files changed while being read; the archive is still
+        # usable. A negative status means tar was killed and the archive is cut short
+        if tar_status not in (0, 1) or compress_status != 0:
+            os.unlink(partial_file)
+            raise RuntimeError(f"tar exited {tar_status}, compressor exited {compress_status}")
+        os.replace(partial_file, backup_file)
+        with open(fingerprint_file, "w") as f:
+            f.write(fingerprint + "\n")
+
+        # The new archive supersedes the pre-zstd one; stop restoring/storing it
+        if backup_file == ROOT_BACKUP_FILE:
+            try:
+                os.unlink(LEGACY_ROOT_BACKUP_FILE)
+                print(f"Removed legacy backup {LEGACY_ROOT_BACKUP_FILE}", file=sys.stderr)
+            except FileNotFoundError:
+                pass
         
         print(f"Backup saved to {backup_file}", file=sys.stderr)
         return backup_file
@@ -51,52 +247,108 @@ def create_backup(source_dir="/root", backup_file=None, exclude_patterns=None):
 
 def register_root_backup():
     """Register root backup function to run on exit."""
-    atexit.register(lambda: create_backup("/root"))
+    atexit.register(functools.partial(create_backup, "/root"))
+
+
+def _periodic_backup(stop, interval, backup_args):
+    """Re-run create_backup every interval seconds until stop is set."""
+    while not stop.wait(interval):
+        create_backup(*backup_args)
 
 
-def register_llama_backup():
-    """Register llama backup function to run on exit."""
-    atexit.register(lambda: create_backup("/opt/models/unsloth", "/data/llama_backup.tar.gz"))
+def _final_backup(stop, worker, backup_args):
+    """Stop the periodic backup thread, then take the exit backup."""
+    stop.set()
+    worker.join()  # Let an in-flight backup finish; both write the same .partial file
+    create_backup(*backup_args)
 
 
-def register_custom_backup(source_dir, backup_file=None, exclude_patterns=None):
+def register_custom_backup(source_dir, backup_file=None, exclude_patterns=None, interval=None):
     """
     Register custom backup function to run on exit.
+
+    With an interval, the backup is also refreshed by a background thread
+    while the box runs. The exit backup then only archives changes made since
+    the last refresh, and is skipped entirely when there are none. A warm
+    container registering the same backup again keeps its running thread.
     
     Args:
         source_dir (str): Directory to backup
         backup_file (str): Output backup file path (optional)
         exclude_patterns (list): Patterns to exclude (optional)
+        interval (float): Seconds between background backups (optional)
     """
-    backup_func = lambda: create_backup(source_dir, backup_file, exclude_patterns)
-    atexit.register(backup_func)
+    backup_args = (source_dir, backup_file, exclude_patterns)
+    if not interval:
+        atexit.register(functools.partial(create_backup, *backup_args))
+        return
+    # A warm container's earlier launch already runs this backup, and its
+    # exit hook is registered; starting another would only race it
+    worker = _backup_workers.get(backup_args)
+    if worker is not None and worker.is_alive():
+        return
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=_periodic_backup, args=(stop, interval, backup_args), daemon=True
+    )
+    worker.start()
+    _backup_workers[backup_args] = worker
+    atexit.register(_final_backup, stop, worker, backup_args)
 
 
-def restore_backup(backup_file="/data/root_full_backup.tar.gz", restore_dir="/"):
+def restore_backup(backup_file=ROOT_BACKUP_FILE, restore_dir="/root"):
     """
     Restore previous session backup if available.
+
+    Falls back to the legacy gzip archive when no zstd root backup exists yet.
+    The archive is verified before anything in restore_dir is touched, so
+    it is decompressed twice: once to check it, once to extract it.
     
     Args:
         backup_file: Path to backup file
-        restore_dir: Directory to restore to (default: /)
+        restore_dir: Directory to restore to (default: /root)
     """
-    import os
-    import subprocess
-    
+    # Wait out a backup of this file still running from an earlier launch;
+    # it would be archiving the tree the restore is replacing
+    with _backup_lock(backup_file):
+        _restore_backup(backup_file, restore_dir)
+
+
+def _restore_backup(backup_file, restore_dir):
+    """Extract backup_file into restore_dir; restore_backup holds the file's lock."""
+    if backup_file == ROOT_BACKUP_FILE and not os.path.exists(backup_file):
+        backup_file = LEGACY_ROOT_BACKUP_FILE
+
     if os.path.exists(backup_file):
         print("Restoring previous session data...", file=sys.stderr)
         try:
-            # Clean restore directory (preserve only essential system files)
-            subprocess.run([
-                "find", "/root", "-mindepth", "1", "-maxdepth", "1",
-                "!", "-name", "lost+found",
-                "-exec", "rm", "-rf", "{}", "+"
-            ], check=False)
-            
-            # Extract backup
-            subprocess.run(["tar", "-xzf", backup_file, "-C", restore_dir], check=True)
+            # Extract in one pass; --recursive-unlink replaces the existing
+            # tree instead of a separate delete phase
+            extract_cmd = ["tar", "--overwrite", "--recursive-unlink", "-C", restore_dir, "-xf"]
+            commands = get_decompress_commands(backup_file)
+            if commands is None:
+                # Unknown format: let tar verify and detect it, at the cost of two reads
+                subprocess.run(["tar", "-tf", backup_file], check=True, stdout=subprocess.DEVNULL)
+                subprocess.run([*extract_cmd, backup_file], check=True)
+            else:
+                test_cmd, decompress_cmd = commands
+                # Checksum the archive so a corrupt backup never wipes the home dir.
+                # This decompresses the whole archive once more before extracting;
+                # the second pass is the price of verifying before anything is
+                # unlinked (a staging extract can't be swapped in for /root,
+                # which holds the persistence mounts)
+                subprocess.run(test_cmd, check=True)
+                decompress = subprocess.Popen(decompress_cmd, stdout=subprocess.PIPE)
+                _grow_pipe(decompress.stdout)
+                tar = subprocess.Popen([*extract_cmd, "-"], stdin=decompress.stdout)
+                decompress.stdout.close()  # tar owns the read end now
+                tar_status = tar.wait()
+                decompress_status = decompress.wait()
+                # tar may stop at the end-of-archive marker and close the pipe
+                # before the trailing padding is decompressed (SIGPIPE)
+                if tar_status or decompress_status not in (0, -signal.SIGPIPE):
+                    raise RuntimeError(f"tar exited {tar_status}, decompressor exited {decompress_status}")
             print("Session data restored successfully!", file=sys.stderr)
             
         except Exception as e:
             print(f"Warning: Restore failed - {e}, continuing with clean environment", file=sys.stderr)
-            
\ No newline at end of file
@@ -7,13 +7,74 @@ and global settings used across DevBox
 Author: GoodieHART
 """
 
+import functools
+import os
+import types
+
 # Container will shut down if no one is connected via SSH for this many seconds.
 # All Time Values are in seconds
 IDLE_TIMEOUT_SECONDS = 300  # 5 minutes
 
+# Idle check backs off exponentially between these bounds while nothing changes
+IDLE_CHECK_MIN_INTERVAL = 5
+IDLE_CHECK_MAX_INTERVAL = 60
+
+# How long to wait for sshd to accept connections before opening the tunnel
+SSHD_READY_TIMEOUT = 5
+
+# sshd probes silent clients this often and drops them after three missed replies
+SSH_CLIENT_ALIVE_INTERVAL = 30
+
+# Session backups (zstd-compressed; .tar.gz is the pre-zstd format)
+ROOT_BACKUP_FILE = "/data/root_full_backup.tar.zst"
+LEGACY_ROOT_BACKUP_FILE = "/data/root_full_backup.tar.gz"
+
+# Regenerable caches left out of the /root backup (tar --exclude patterns;
+# "./" anchors a pattern at /root, bare names match at any depth)
+ROOT_BACKUP_EXCLUDES = [
+    "lost+found",
+    "node_modules",
+    "./.cache",
+    "./.npm/_cacache",
+    "./.cargo/registry/cache",
+    "./.cargo/registry/src",
+    "./.rustup/toolchains/*/share/doc",
+    "./.vscode-server/cli",
+    "./.mozilla/firefox/*/Cache*",
+    "./.config/google-chrome/*/Cache*",
+]
+
+# Session backups are also refreshed in the background this often, so the
+# exit backup usually finds nothing new to archive
+BACKUP_SYNC_INTERVAL = 900  # 15 minutes
+
+# Downloaded .deb files for runtime extra_packages installs, kept on the volume
+APT_CACHE_DIR = "/data/.apt-cache"
+
+# Tools users most often ask for as extra_packages, baked into the SSH/RDP
+# images so any subset of them installs nothing at launch
+COMMON_EXTRA_PACKAGES = [
+    "tmux",
+    "jq",
+    "ripgrep",
+    "tree",
+    "lsof",
+]
+
+# Further space-separated apt packages baked into the SSH/RDP images at deploy time,
+# e.g. DEVBOX_PREBAKED_PACKAGES="htop tmux" modal run devbox.py
+PREBAKED_PACKAGES_ENV = "DEVBOX_PREBAKED_PACKAGES"
+
+# Warm containers kept for the most used boxes on a deployed app. Billed while
+# idle, so opt-in: DEVBOX_MIN_CONTAINERS=1 modal deploy devbox.py. Only read
+# locally at deploy time; the value frozen into container snapshots is unused
+DEVBOX_MIN_CONTAINERS = int(os.environ.get("DEVBOX_MIN_CONTAINERS", "0"))
+
+
 # Version constants
 LLAMACPP_VERSION = "b9058" # this will be made dynamic in future
 STARSHIP_VERSION = "v1.22.1"
+NODE_VERSION = "v20.17.0"
 
 # Resource configurations for different DevBox types
 
@@ -76,9 +137,23 @@ LLAMACPP_GPU_DEVBOX_ARGS = {
 # llama.cpp idle timeout (separate from container timeout)
 LLAMACPP_IDLE_TIMEOUT = 3600  # 1 hour idle
 
+# llama-server's stderr, kept for diagnosing a server that fails to start
+LLAMA_SERVER_LOG = "/tmp/llama-server.log"
+
+# GGUF models are cached on the volume under MODELS_DIR/<repo_id>/<filename>,
+# so each is fetched at most once per volume
+MODELS_DIR = "/data/models"
+
+# Model downloads are tried this many times; retries drop hf_transfer, which
+# can't resume, so they continue the partial file single-stream
+MODEL_DOWNLOAD_ATTEMPTS = 3
+
 # Package groups for reusable configurations
 CORE_DEV_PACKAGES = [
     "openssh-server",
+    "openssh-sftp-server",  # Only a Recommends of openssh-server; needed by scp/IDE remotes
+    "ca-certificates",  # Only a Recommends of curl/wget; needed for HTTPS
+    "less",
     "git",
     "nano",
     "neovim",
@@ -86,6 +161,7 @@ CORE_DEV_PACKAGES = [
     "wget",
     "unzip",
     "procps",
+    "zstd",
 ]
 
 EXTENDED_DEV_PACKAGES = [
@@ -98,6 +174,17 @@ EXTENDED_DEV_PACKAGES = [
     "python3-dev",
 ]
 
+# Pandoc plus the TeX packages its pdflatex/xelatex/lualatex engines need
+DOC_PROCESSING_PACKAGES = [
+    "pandoc",
+    "texlive-latex-recommended",
+    "texlive-latex-extra",
+    "texlive-fonts-recommended",
+    "texlive-xetex",
+    "texlive-luatex",
+    "lmodern",
+]
+
 # Download tool packages for all DevBox images
 DOWNLOAD_APT_PACKAGES = [
     "megatools",
@@ -110,8 +197,25 @@ DOWNLOAD_PIP_PACKAGES = [
     "terabox-downloader",
 ]
 
+@functools.lru_cache(maxsize=None)
+def _base_resource_config(config_type, is_rdp):
+  """
+    Look up the static resource arguments for a DevBox type.
+
+    Cached because the input domain is tiny; the returned mapping is
+    read-only so callers cannot mutate the shared instance.
+    """
+  if config_type == "cpu":
+    base_config = CPU_DEVBOX_ARGS_RDP if is_rdp else CPU_DEVBOX_ARGS
+  elif config_type == "gpu":
+    base_config = GPU_DEVBOX_ARGS_RDP if is_rdp else GPU_DEVBOX_ARGS
+  else:
+    raise ValueError(f"Unknown config_type: {config_type}")
+  return types.MappingProxyType(base_config.copy())
+
+
 # Function to fill in runtime modal objects
-def get_resource_config(config_type="cpu", is_rdp=False, secrets=None, volume=None):
+def get_resource_config(config_type="cpu", is_rdp=False, secrets=None, volume=None, volumes=None):
   """
     Get complete resource configuration for DevBox type.
     
@@ -119,18 +223,28 @@ def get_resource_config(config_type="cpu", is_rdp=False, secrets=None, volume=No
         config_type: "cpu" or "gpu"
         gpu_type: GPU type if config_type="gpu" (t4, l4, a10g, l40s)
         is_rdp: Whether this is for RDP environment
+        secrets: Modal secrets to attach
+        volume: Volume to mount at /data (ignored if volumes is given)
+        volumes: Shared mount mapping to reuse as-is
         
     Returns:
         dict: Complete configuration with Modal objects
     """
-  if config_type == "cpu":
-    base_config = CPU_DEVBOX_ARGS_RDP if is_rdp else CPU_DEVBOX_ARGS
-  elif config_type == "gpu":
-    base_config = GPU_DEVBOX_ARGS_RDP if is_rdp else GPU_DEVBOX_ARGS
-  else:
-    raise ValueError(f"Unknown config_type: {config_type}")
-
-  config = base_config.copy()
+  config = dict(_base_resource_config(config_type, bool(is_rdp)))
   config["secrets"] = secrets
-  config["volumes"] = {"/data": volume}
-  return config
\ No newline at end of file
+  config["volumes"] = volumes if volumes is not None else {"/data": volume}
+  return config
+
+
+def devbox_debug_enabled():
+  """
+    Check for verbose startup diagnostics (SSH key injection report).
+
+    Set DEVBOX_DEBUG=1 in the container, e.g. through one of the attached
+    secrets. Read on every call rather than at import, because imports are
+    frozen into memory snapshots and restored containers would miss it.
+
+    Returns:
+        bool: True if DEVBOX_DEBUG=1 is set
+    """
+  return os.environ.get("DEVBOX_DEBUG") == "1"
@@ -1,13 +1,16 @@
 import modal
-import random
-import platform
 
 from images import (
     standard_devbox_image, cuda_devbox_image, doc_processing_image,
     assisted_coding_image, llm_playroom_image, llamacpp_cpu_image, rdp_devbox_image, forensic_analysis_image
 )
-from shared_runtime import run_devbox_shared, run_rdp_devbox_shared
-from config import get_resource_config, LLAMACPP_DEVBOX_ARGS, LLAMACPP_GPU_DEVBOX_ARGS, LLAMACPP_IDLE_TIMEOUT
+from shared_runtime import run_devbox_shared, run_rdp_devbox_shared, count_established_connections, has_ssh_session, spawn_service, start_sshd, wait_until_idle, SSH_COMMAND_TEMPLATE
+from config import get_resource_config, DEVBOX_MIN_CONTAINERS, LLAMACPP_DEVBOX_ARGS, LLAMACPP_GPU_DEVBOX_ARGS, LLAMACPP_IDLE_TIMEOUT, LLAMA_SERVER_LOG, MODEL_DOWNLOAD_ATTEMPTS, MODELS_DIR
+
+# Only installed in the llama.cpp image; imported at module level there so
+# the import is captured in the memory snapshot
+with llamacpp_cpu_image.imports():
+    import httpx
 
 
 app = modal.App(
@@ -17,90 +20,119 @@ app = modal.App(
 
 dev_volume = modal.Volume.from_name("my-dev-volume", create_if_missing=True)
 
+# One mount mapping shared by every function
+data_volumes = {"/data": dev_volume}
+
 juicy_secrets = [modal.Secret.from_name("ssh-public-key"), modal.Secret.from_name("gemini-api-key"), modal.Secret.from_name("exa-api-key")] # Right now, all boxes will be filled with these secrets even if it may not directly be intented.
 
 # Common arguments for the devbox functions loaded from config.py and None values such as secret and volume are filled with values defined above
-cpu_devbox_args = get_resource_config("cpu", secrets= juicy_secrets, volume = dev_volume)
+cpu_devbox_args = get_resource_config("cpu", secrets= juicy_secrets, volumes = data_volumes)
 
-cpu_devbox_args_rdp = get_resource_config("cpu", secrets = juicy_secrets, volume = dev_volume, is_rdp = True)
+cpu_devbox_args_rdp = get_resource_config("cpu", secrets = juicy_secrets, volumes = data_volumes, is_rdp = True)
 
-gpu_devbox_args = get_resource_config("gpu", secrets = juicy_secrets, volume = dev_volume, is_rdp = True)
+gpu_devbox_args = get_resource_config("gpu", secrets = juicy_secrets, volumes = data_volumes, is_rdp = True)
 
-gpu_devbox_args_rdp = get_resource_config("gpu", secrets = juicy_secrets, volume = dev_volume, is_rdp = True)
+gpu_devbox_args_rdp = get_resource_config("gpu", secrets = juicy_secrets, volumes = data_volumes, is_rdp = True)
 
-# llama.cpp Research Center config - fill in secrets and volume
-llamacpp_devbox_args = LLAMACPP_DEVBOX_ARGS.copy()
-llamacpp_devbox_args["secrets"] = juicy_secrets
-llamacpp_devbox_args["volumes"] = {"/data": dev_volume}
+# Friendly package names mapped to their Debian equivalents
+PACKAGE_ALIASES = {"python": "python-is-python3"}
 
-# GPU llama.cpp Research Center config - fill in secrets and volume
-llamacpp_gpu_devbox_args = LLAMACPP_GPU_DEVBOX_ARGS.copy()
-llamacpp_gpu_devbox_args["secrets"] = juicy_secrets
-llamacpp_gpu_devbox_args["volumes"] = {"/data": dev_volume}
+# llama.cpp Research Center configs - same secrets and volume mapping as the other boxes
+llamacpp_devbox_args = {**LLAMACPP_DEVBOX_ARGS, "secrets": juicy_secrets, "volumes": data_volumes}
 
-@app.function(image=standard_devbox_image, **cpu_devbox_args)
+llamacpp_gpu_devbox_args = {**LLAMACPP_GPU_DEVBOX_ARGS, "secrets": juicy_secrets, "volumes": data_volumes}
+
+# Every function opts into memory snapshots: restores start from the imported
+# runtime modules instead of re-importing them. Everything module-level code
+# computed at import is frozen too, so environment-dependent settings are read
+# at call time; mounts, processes and tunnels are all set up after restore.
+@app.function(image=standard_devbox_image, min_containers=DEVBOX_MIN_CONTAINERS, enable_memory_snapshot=True, **cpu_devbox_args)
 def launch_devbox(extra_packages: list[str] | None = None):
     """Launches a non-GPU personal development environment."""
     run_devbox_shared(extra_packages, devbox_type="standard_devbox")
 
 
-@app.function(image=cuda_devbox_image, gpu="t4", **gpu_devbox_args)
+@app.function(image=cuda_devbox_image, gpu="t4", enable_memory_snapshot=True, **gpu_devbox_args)
 def launch_devbox_t4(extra_packages: list[str] | None = None):
     """Launches a T4 GPU-powered personal development environment."""
     run_devbox_shared(extra_packages, devbox_type="cuda_devbox_t4")
 
 
-@app.function(image=cuda_devbox_image, gpu="l4", **gpu_devbox_args)
+@app.function(image=cuda_devbox_image, gpu="l4", enable_memory_snapshot=True, **gpu_devbox_args)
 def launch_devbox_l4(extra_packages: list[str] | None = None):
     """Launches an L4 GPU-powered personal development environment."""
     run_devbox_shared(extra_packages, devbox_type="cuda_devbox_l4")
 
 
-@app.function(image=cuda_devbox_image, gpu="a10g", **gpu_devbox_args)
+@app.function(image=cuda_devbox_image, gpu="a10g", enable_memory_snapshot=True, **gpu_devbox_args)
 def launch_devbox_a10g(extra_packages: list[str] | None = None):
     """Launches an A10G GPU-powered personal development environment."""
     run_devbox_shared(extra_packages, devbox_type="cuda_devbox_a10g")
 
-@app.function(image=rdp_devbox_image, **cpu_devbox_args_rdp)
+@app.function(image=rdp_devbox_image, enable_memory_snapshot=True, **cpu_devbox_args_rdp)
 def launch_rdp_devbox(extra_packages: list[str] = None):
     """Launches an RDP desktop development environment."""
     run_rdp_devbox_shared(extra_packages)
 
-@app.function(image=rdp_devbox_image, gpu="t4", **gpu_devbox_args_rdp)
+@app.function(image=rdp_devbox_image, gpu="t4", enable_memory_snapshot=True, **gpu_devbox_args_rdp)
 def launch_rdp_devbox_t4(extra_packages: list[str] = None):
     """Launches an RDP desktop with T4 GPU."""
     run_rdp_devbox_shared(extra_packages)
 
-@app.function(image=rdp_devbox_image, gpu="l4", **gpu_devbox_args_rdp)
+@app.function(image=rdp_devbox_image, gpu="l4", enable_memory_snapshot=True, **gpu_devbox_args_rdp)
 def launch_rdp_devbox_l4(extra_packages: list[str] = None):
     """Launches an RDP desktop with L4 GPU."""
     run_rdp_devbox_shared(extra_packages)
 
-@app.function(image=rdp_devbox_image, gpu="a10g", **gpu_devbox_args_rdp)
+@app.function(image=rdp_devbox_image, gpu="a10g", enable_memory_snapshot=True, **gpu_devbox_args_rdp)
 def launch_rdp_devbox_a10g(extra_packages: list[str] = None):
     """Launches an RDP desktop with A10G GPU."""
     run_rdp_devbox_shared(extra_packages)
 
-@app.function(image=doc_processing_image, **gpu_devbox_args)
+@app.function(image=doc_processing_image, enable_memory_snapshot=True, **gpu_devbox_args)
 def launch_doc_processor():
-    """Launches a document processing environment with Pandoc and TeX Live."""
+    """
+    Launches a document processing environment with Pandoc and TeX Live.
+
+    Ships a curated TeX Live subset (LaTeX recommended/extra, recommended
+    fonts, XeTeX, LuaTeX, Latin Modern) rather than texlive-full, which covers
+    pandoc's PDF engines at a fraction of the image size. Extra TeX packages
+    can be added at runtime with apt-get install texlive-<collection>.
+    """
     run_devbox_shared(extra_packages=None, devbox_type="doc_processing")
 
-@app.function(image=assisted_coding_image, **cpu_devbox_args)
+@app.function(image=assisted_coding_image, min_containers=DEVBOX_MIN_CONTAINERS, enable_memory_snapshot=True, **cpu_devbox_args)
 def launch_assisted_coding():
     """Launches a development environment with Gemini CLI & OpenCode pre-installed."""
     run_devbox_shared(extra_packages=None, devbox_type="assisted_coding")
 
-@app.function(image=llm_playroom_image, **gpu_devbox_args_rdp) # Needs review
+@app.function(image=llm_playroom_image, enable_memory_snapshot=True, **gpu_devbox_args_rdp) # Needs review
 def launch_llm_playroom():
     """Launches an LLM Playroom environment with Ollama and preloaded models."""
     run_devbox_shared(extra_packages=None, devbox_type="llm_playroom") # add model selection here too!
 
-@app.function(image=forensic_analysis_image, **cpu_devbox_args)
+@app.function(image=forensic_analysis_image, enable_memory_snapshot=True, **cpu_devbox_args)
 def launch_forensics_image():
   """ Launches A Forensic Analysis Machine With Volatilty3 pre-installed. """
   run_devbox_shared(extra_packages=None, devbox_type="forensic_analysis")
 
+# GPU menu choices mapped to (label, launcher). Modal fixes the GPU per
+# registered function, so each GPU keeps its own thin wrapper above.
+CUDA_DEVBOX_LAUNCHERS = {
+    "1": ("T4", launch_devbox_t4),
+    "2": ("L4", launch_devbox_l4),
+    "3": ("A10G", launch_devbox_a10g),
+}
+
+RDP_GPU_LAUNCHERS = {
+    "1": ("T4", launch_rdp_devbox_t4),
+    "2": ("L4", launch_rdp_devbox_l4),
+    "3": ("A10G", launch_rdp_devbox_a10g),
+}
+
+# --gpu flag values mapped to the GPU menu choices above
+GPU_FLAG_CHOICES = {"t4": "1", "l4": "2", "a10g": "3"}
+
 # llama.cpp Research Center - Curated Model Catalog
 LLAMACPP_MODELS = {
     "1": {
@@ -154,98 +186,221 @@ LLAMACPP_MODELS = {
         "settings": {"temp": 0.7, "top_p": 0.9, "top_k": 40}
     },
 }
-#The models list will be moved to a better /dedicated file
-@app.function(image=llamacpp_cpu_image, **llamacpp_devbox_args)
-def launch_llamacpp_playroom():
-    """llama.cpp Research Center with curated models, WebUI, and EXA Search."""
-    import os
-    import shutil
-    import subprocess
-    import sys
-    import modal
-    import time
-    import json
-    import httpx
-    from utils import inject_ssh_key
-    from exa_helper import get_exa_api_key, get_tools_for_model
-    
-    modal.interact()  # Enable user input
-    
-    print("\n🧠 Launching llama.cpp Research Center")
-    print("💻 CPU-Optimized Inference")
-    print("🔍 EXA Search Integration")
-    print("🌐 Built-in WebUI")
-    
-    # --- Persistence Setup ---
-    persistent_storage_dir = "/data/.config_persistence"
-    os.makedirs(persistent_storage_dir, exist_ok=True)
-    
-    items_to_persist = [
-        ".bash_history", ".bashrc", ".profile", ".viminfo", ".vimrc",
-        ".gitconfig", ".ssh/config", ".ssh/known_hosts",
-    ]
-    
-    for item in items_to_persist:
-        home_path = f"/root/{item}"
-        volume_path = f"{persistent_storage_dir}/{item}"
-        os.makedirs(os.path.dirname(home_path), exist_ok=True)
-        os.makedirs(os.path.dirname(volume_path), exist_ok=True)
-        
-        if os.path.lexists(home_path):
-            if os.path.isdir(home_path) and not os.path.islink(home_path):
-                shutil.rmtree(home_path)
-            else:
-                os.remove(home_path)
-        
-        os.symlink(volume_path, home_path)
-    
-    # --- Model Selection ---
+
+
+def select_llamacpp_model():
+    """
+    Ask for a catalog model on the local machine, before any container starts.
+
+    Returns:
+        tuple: (model_choice, repo_id, filename); repo_id and filename are
+        only filled in for the custom model
+    """
     print("\n📦 Model Selection:")
     for key, model in LLAMACPP_MODELS.items():
         print(f"{key}. {model['name']} - {model['description']}")
         print(f"   Size: {model['size']} | Type: {model['type']}")
-    
+
     try:
-        model_choice = input("\nEnter model number (1-7): ").strip()
+        model_choice = input(f"\nEnter model number (1-{len(LLAMACPP_MODELS)}): ").strip()
     except EOFError:
         model_choice = "1"
-    
+
     if model_choice not in LLAMACPP_MODELS:
         print("❌ Invalid choice. Defaulting to Qwen3.5-9B")
         model_choice = "1"
-    
-    selected_model = LLAMACPP_MODELS[model_choice].copy()
-    
+
+    repo_id = filename = ""
     # Handle custom model input
-    if model_choice == "7":
+    if LLAMACPP_MODELS[model_choice]["repo_id"] is None:
         print("\n📝 Custom Model Details:")
-        repo_id = input("Repo ID (e.g., unsloth/Qwen3.5-9B-GGUF): ").strip()
-        filename = input("Filename (e.g., model-Q4_K_M.gguf): ").strip()
+        try:
+            repo_id = input("Repo ID (e.g., unsloth/Qwen3.5-9B-GGUF): ").strip()
+            filename = input("Filename (e.g., model-Q4_K_M.gguf): ").strip()
+        except EOFError:
+            pass
+        if not (repo_id and filename):
+            print("❌ Missing repo ID or filename. Defaulting to Qwen3.5-9B")
+            model_choice = "1"
+    return model_choice, repo_id, filename
+
+
+def get_llamacpp_model(model_choice, repo_id="", filename=""):
+    """
+    Resolve a model choice made by select_llamacpp_model.
+
+    Args:
+        model_choice: LLAMACPP_MODELS key
+        repo_id: Hub repository for the custom model
+        filename: GGUF file for the custom model
+
+    Returns:
+        dict: Copy of the catalog entry, with custom details filled in
+    """
+    selected_model = LLAMACPP_MODELS.get(model_choice, LLAMACPP_MODELS["1"]).copy()
+    if selected_model["repo_id"] is None:
         selected_model["repo_id"] = repo_id
         selected_model["filename"] = filename
         selected_model["name"] = filename.replace(".gguf", "")
+    return selected_model
+
+
+def get_model_sha256(repo_id, filename):
+    """
+    Look up the SHA-256 the Hub records for a model file.
+
+    Args:
+        repo_id: Hub repository, e.g. "unsloth/Qwen3.5-9B-GGUF"
+        filename: File within the repository
+
+    Returns:
+        str: Hex digest, or None for files not stored in LFS or when the
+        Hub cannot be reached
+    """
+    from huggingface_hub import HfApi
+
+    try:
+        (info,) = HfApi().get_paths_info(repo_id, [filename])
+    except Exception as e:
+        print(f"⚠️  Could not fetch checksum for {filename}: {e}")
+        return None
+    return info.lfs.sha256 if getattr(info, "lfs", None) else None
+
+
+def file_sha256(path, chunk_size=8 << 20):
+    """
+    Hash a file with SHA-256, reading it in large chunks into one buffer.
+
+    hashlib is backed by OpenSSL, which uses the CPU's SHA extensions
+    (SHA-NI / ARMv8) where present.
+
+    Args:
+        path: File to hash
+        chunk_size: Bytes read per call
+
+    Returns:
+        str: Hex digest
+    """
+    import hashlib
+
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buffer):
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def download_model(repo_id, filename, model_dir):
+    """
+    Download one model file from the Hugging Face Hub into model_dir.
+
+    The image enables hf_transfer, which fetches the file over parallel
+    ranged connections. hf_transfer cannot resume, though: a failed
+    attempt leaves its partial file under model_dir/.cache, and retries
+    turn hf_transfer off so huggingface_hub's own single-stream downloader
+    continues that file instead of starting over. A completed file is
+    checked against the Hub's SHA-256; a corrupt one is deleted and
+    fetched again. A verified file gets a "<file>.done" sidecar with its
+    digest and size; a model without one is downloaded again, which
+    re-checks a complete file on the volume rather than fetching it.
+
+    Args:
+        repo_id: Hub repository, e.g. "unsloth/Qwen3.5-9B-GGUF"
+        filename: File within the repository
+        model_dir: Local directory to download into
+
+    Returns:
+        bool: True once the file is complete and verified
+    """
+    import os
+    import subprocess
+
+    model_path = os.path.join(model_dir, filename)
+    expected_sha256 = get_model_sha256(repo_id, filename)
+
+    for attempt in range(1, MODEL_DOWNLOAD_ATTEMPTS + 1):
+        env = None if attempt == 1 else {**os.environ, "HF_HUB_ENABLE_HF_TRANSFER": "0"}
+        result = subprocess.run(["hf", "download", repo_id, filename, "--local-dir", model_dir], env=env)
+        if result.returncode == 0:
+            if expected_sha256 is not None:
+                print("🔎 Verifying checksum...")
+                if file_sha256(model_path) != expected_sha256:
+                    print("❌ Checksum mismatch, discarding the corrupt file")
+                    os.unlink(model_path)
+                    continue
+                print("✅ Checksum OK")
+            # Written last, so only a complete, verified file ever has one
+            with open(model_path + ".done", "w") as f:
+                f.write(f"{expected_sha256 or 'unverified'}\n{os.path.getsize(model_path)}\n")
+            return True
+        if attempt < MODEL_DOWNLOAD_ATTEMPTS:
+            print(f"⚠️  Download failed (attempt {attempt}/{MODEL_DOWNLOAD_ATTEMPTS}), resuming without hf_transfer...")
+    return False
+
+
+#The models list will be moved to a better /dedicated file
+def run_llamacpp_playroom(model_choice, repo_id, filename, gpu_name=None):
+    """
+    Shared llama.cpp Research Center runtime for the CPU and GPU playrooms.
+
+    Downloads the chosen model, starts llama-server (and the EXA proxy when
+    a key is configured), opens the SSH and WebUI tunnels, and serves until
+    both have been idle for LLAMACPP_IDLE_TIMEOUT.
+
+    Args:
+        model_choice: LLAMACPP_MODELS key picked by select_llamacpp_model
+        repo_id: Hub repository for the custom model
+        filename: GGUF file for the custom model
+        gpu_name: GPU label to offload all layers to; None for CPU inference
+    """
+    import os
+    import subprocess
+    import time
+    from utils import inject_ssh_key
+    from exa_helper import get_exa_api_key
+    from persistence_utils import setup_persistence, get_persistence_items
+
+    selected_model = get_llamacpp_model(model_choice, repo_id, filename)
+
+    # Multi-line messages are joined and printed in one write each
+    print("\n".join([
+        "\n🧠 Launching llama.cpp Research Center",
+        f"🚀 GPU-Accelerated Inference ({gpu_name})" if gpu_name else "💻 CPU-Optimized Inference",
+        "🔍 EXA Search Integration",
+        "🌐 Built-in WebUI",
+    ]))
+    
+    # --- Persistence Setup ---
+    setup_persistence(get_persistence_items("ssh"))
     
     # --- Download Model ---
-    model_dir = "/data/models"
+    # One directory per repository, so same-named files from different repos
+    # (e.g. custom models) never overwrite each other
+    model_dir = os.path.join(MODELS_DIR, selected_model["repo_id"])
     os.makedirs(model_dir, exist_ok=True)
     model_path = f"{model_dir}/{selected_model['filename']}"
     
-    if not os.path.exists(model_path):
-        print(f"\n📦 Downloading {selected_model['repo_id']}/{selected_model['filename']}...")
-        print("   This may take a few minutes on first run...")
+    # Models cached before the per-repo layout sit directly in MODELS_DIR;
+    # a rename on the volume keeps them, and the download below only
+    # re-checks the file against the Hub
+    legacy_path = os.path.join(MODELS_DIR, selected_model["filename"])
+    if not os.path.exists(model_path) and os.path.isfile(legacy_path):
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        os.rename(legacy_path, model_path)
+    
+    # Only the sidecar marks a finished download; a bare file may be partial
+    if not os.path.exists(f"{model_path}.done"):
+        print(f"\n📦 Downloading {selected_model['repo_id']}/{selected_model['filename']}...\n"
+              "   This may take a few minutes on first run...")
         
-        try:
-            subprocess.run([
-                "hf", "download",
-                selected_model["repo_id"],
-                selected_model["filename"],
-                "--local-dir", model_dir
-            ], check=True)
+        if download_model(selected_model["repo_id"], selected_model["filename"], model_dir):
             print(f"✅ Model downloaded to {model_path}")
-        except subprocess.CalledProcessError:
-            print(f"❌ Download failed. Check repo_id and filename.")
-            print(f"   Repo: {selected_model['repo_id']}")
-            print(f"   File: {selected_model['filename']}")
+        else:
+            print("❌ Download failed. Check repo_id and filename.\n"
+                  f"   Repo: {selected_model['repo_id']}\n"
+                  f"   File: {selected_model['filename']}")
             return
     else:
         print(f"✅ Model already cached: {model_path}")
@@ -256,37 +411,61 @@ def launch_llamacpp_playroom():
         print("✅ EXA Search API key found")
         use_exa = True
     else:
-        print("⚠️  EXA Search API key not found. Web search disabled.")
-        print("   Add 'exa-api-key' secret to Modal to enable.")
+        print("⚠️  EXA Search API key not found. Web search disabled.\n"
+              "   Add 'exa-api-key' secret to Modal to enable.")
         use_exa = False
     
     # --- Start llama-server ---
     model_settings = selected_model.get('settings', {})
     
     server_cmd = [
-        "llama-server",
+        "/usr/local/bin/llama-server",
         "-m", model_path,
         "--host", "0.0.0.0",
         "--port", "8080",
-        "--threads", "2",
-        "--ctx-size", "4096",
         "--batch-size", "512",
-        "--mlock",
         "--jinja",  # Enable function calling + WebUI
         "--temp", str(model_settings.get('temp', 0.7)),
         "--top-p", str(model_settings.get('top_p', 0.9)),
         "--top-k", str(model_settings.get('top_k', 40)),
     ]
+    if gpu_name:
+        server_cmd += [
+            "--ctx-size", "32768",
+            "-ngl", "99",         # Offload all layers to GPU
+            "-fa", "on",          # Flash Attention
+            "-ctk", "q8_0",       # Key cache quantization
+            "-ctv", "q8_0",       # Value cache quantization
+        ]
+        start_lines = [
+            f"\n🚀 Starting GPU-accelerated llama-server for {selected_model['name']}...",
+            f"   GPU: {gpu_name} (all layers offloaded)",
+        ]
+    else:
+        server_cmd += [
+            "--threads", "2",
+            "--ctx-size", "4096",
+            "--mlock",
+        ]
+        start_lines = [f"\n🚀 Starting llama-server for {selected_model['name']}..."]
+    start_lines.append(f"   Settings: temp={model_settings.get('temp', 0.7)}, top_p={model_settings.get('top_p', 0.9)}")
+    if gpu_name:
+        start_lines.append("   Context: 32K with KV cache quantization")
+    print("\n".join(start_lines))
+    
+    # Start server in background; its log goes to a file, since nothing ever
+    # drained the old stderr pipe and a full pipe stalls the server
+    with open(LLAMA_SERVER_LOG, "ab") as server_log:
+        server_process = spawn_service(
+            server_cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=server_log,
+        )
     
-    print(f"\n🚀 Starting llama-server for {selected_model['name']}...")
-    print(f"   Settings: temp={model_settings.get('temp', 0.7)}, top_p={model_settings.get('top_p', 0.9)}")
-    
-    # Start server in background
-    server_process = subprocess.Popen(
-        server_cmd,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.PIPE
-    )
+    # --- SSH Setup ---
+    # Started while llama-server loads the model instead of after it
+    inject_ssh_key()
+    start_sshd()
     
     # Wait for server to be ready
     time.sleep(3)
@@ -300,7 +479,7 @@ def launch_llamacpp_playroom():
             pass
         time.sleep(1)
     else:
-        print("❌ llama-server failed to start. Check model file.")
+        print(f"❌ llama-server failed to start. Check model file and {LLAMA_SERVER_LOG}.")
         server_process.terminate()
         return
     
@@ -313,289 +492,55 @@ def launch_llamacpp_playroom():
     else:
         web_port = 8080
     
-    # --- SSH Setup ---
-    inject_ssh_key()
-    subprocess.run(["/usr/sbin/sshd"])
-    
     # --- Port Forwarding ---
-    with modal.forward(22, unencrypted=True) as ssh_tunnel:
-        ssh_command = f"ssh root@{ssh_tunnel.host} -p {ssh_tunnel.unencrypted_port}"
+    # Both tunnels stay open for the whole session; the SSH one used to close
+    # as soon as its address had been read
+    with modal.forward(22, unencrypted=True) as ssh_tunnel, \
+            modal.forward(web_port, unencrypted=True) as web_tunnel:
+        ssh_command = SSH_COMMAND_TEMPLATE.format(host=ssh_tunnel.host, port=ssh_tunnel.unencrypted_port)
+        web_url = f"http://{web_tunnel.host}:{web_tunnel.unencrypted_port}"
         
-    with modal.forward(web_port, unencrypted=True) as web_tunnel:
-            web_url = f"http://{web_tunnel.host}:{web_tunnel.unencrypted_port}"
-            
-            print("\n" + "="*60)
-            print("🚀 Your llama.cpp Research Center is ready!")
-            print("="*60)
-            print(f"\n🌐 WebUI: {web_url}")
-            print(f"   (Open in browser for chat interface)")
-            print(f"\n🔐 SSH: {ssh_command}")
-            print(f"\n🧠 Model: {selected_model['name']} ({selected_model['size']})")
-            if use_exa:
-                print(f"🔍 EXA Search: Enabled (function calling)")
-            print(f"\n⏰ Idle timeout: {LLAMACPP_IDLE_TIMEOUT // 60} minutes")
-            print("\n" + "="*60)
-            
-            # --- Idle Monitor ---
-            idle_time = 0
-            check_interval = 30
-            
-            while idle_time < LLAMACPP_IDLE_TIMEOUT:
-                time.sleep(check_interval)
-                
-                # Check for active SSH sessions
-                ssh_result = subprocess.run(
-                    "ps -ef | grep 'sshd: root@' | grep -v grep",
-                    shell=True,
-                    capture_output=True,
-                )
-                
-                # Check for active WebUI connections
-                web_active = False
-                try:
-                    stats = httpx.get("http://localhost:8080/health", timeout=1.0)
-                    web_active = True  # Server is running
-                except:
-                    pass
-                
-                if ssh_result.stdout or web_active:
-                    idle_time = 0
-                else:
-                    idle_time += check_interval
-                    remaining = LLAMACPP_IDLE_TIMEOUT - idle_time
-                    print(f"\r💤 No activity. Shutting down in {remaining // 60}m {remaining % 60}s...", end="", flush=True)
-            
-            print(f"\n\n⏰ Idle timeout reached ({LLAMACPP_IDLE_TIMEOUT}s). Shutting down.")
-            server_process.terminate()
-
-@app.function(image=llamacpp_cpu_image, **llamacpp_gpu_devbox_args)
-def launch_llamacpp_playroom_gpu():
-    """GPU-accelerated llama.cpp Research Center with curated models, WebUI, and EXA Search."""
-    import os
-    import shutil
-    import subprocess
-    import sys
-    import modal
-    import time
-    import json
-    import httpx
-    from utils import inject_ssh_key
-    from exa_helper import get_exa_api_key, get_tools_for_model
-    
-    modal.interact()
-    
-    print("\n🧠 Launching llama.cpp Research Center")
-    print("🚀 GPU-Accelerated Inference (T4)")
-    print("🔍 EXA Search Integration")
-    print("🌐 Built-in WebUI")
-    
-    # --- Persistence Setup ---
-    persistent_storage_dir = "/data/.config_persistence"
-    os.makedirs(persistent_storage_dir, exist_ok=True)
-    
-    items_to_persist = [
-        ".bash_history", ".bashrc", ".profile", ".viminfo", ".vimrc",
-        ".gitconfig", ".ssh/config", ".ssh/known_hosts",
-    ]
-    
-    for item in items_to_persist:
-        home_path = f"/root/{item}"
-        volume_path = f"{persistent_storage_dir}/{item}"
-        os.makedirs(os.path.dirname(home_path), exist_ok=True)
-        os.makedirs(os.path.dirname(volume_path), exist_ok=True)
+        ready_lines = [
+            "\n" + "="*60,
+            f"🚀 Your {'GPU ' if gpu_name else ''}llama.cpp Research Center is ready!",
+            "="*60,
+            f"\n🌐 WebUI: {web_url}",
+            "   (Open in browser for chat interface)",
+            f"\n🔐 SSH: {ssh_command}",
+            f"\n🧠 Model: {selected_model['name']} ({selected_model['size']})",
+        ]
+        if gpu_name:
+            ready_lines.append(f"🎮 GPU: {gpu_name} (all layers offloaded)")
+        if use_exa:
+            ready_lines.append("🔍 EXA Search: Enabled (function calling)")
+        ready_lines.append(f"\n⏰ Idle timeout: {LLAMACPP_IDLE_TIMEOUT // 60} minutes")
+        ready_lines.append("\n" + "="*60)
+        print("\n".join(ready_lines))
         
-        if os.path.lexists(home_path):
-            if os.path.isdir(home_path) and not os.path.islink(home_path):
-                shutil.rmtree(home_path)
-            else:
-                os.remove(home_path)
+        # --- Idle Monitor ---
+        # Open WebUI/API clients, or a logged-in SSH session; a bare
+        # connection to port 22 may be an unauthenticated scanner
+        def is_active():
+            return bool(count_established_connections(web_port)) or has_ssh_session()
         
-        os.symlink(volume_path, home_path)
-    
-    # --- Model Selection ---
-    print("\n📦 Model Selection:")
-    for key, model in LLAMACPP_MODELS.items():
-        print(f"{key}. {model['name']} - {model['description']}")
-        print(f"   Size: {model['size']} | Type: {model['type']}")
-    
-    try:
-        model_choice = input("\nEnter model number (1-7): ").strip()
-    except EOFError:
-        model_choice = "1"
-    
-    if model_choice not in LLAMACPP_MODELS:
-        print("❌ Invalid choice. Defaulting to Qwen3.5-9B")
-        model_choice = "1"
-    
-    selected_model = LLAMACPP_MODELS[model_choice].copy()
-    
-    # Handle custom model input
-    if model_choice == "7":
-        print("\n📝 Custom Model Details:")
-        repo_id = input("Repo ID (e.g., unsloth/Qwen3.5-9B-GGUF): ").strip()
-        filename = input("Filename (e.g., model-Q4_K_M.gguf): ").strip()
-        selected_model["repo_id"] = repo_id
-        selected_model["filename"] = filename
-        selected_model["name"] = filename.replace(".gguf", "")
-    
-    # --- Download Model ---
-    model_dir = "/data/models"
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = f"{model_dir}/{selected_model['filename']}"
-    
-    if not os.path.exists(model_path):
-        print(f"\n📦 Downloading {selected_model['repo_id']}/{selected_model['filename']}...")
-        print("   This may take a few minutes on first run...")
+        wait_until_idle(is_active, "SSH/WebUI", timeout=LLAMACPP_IDLE_TIMEOUT)
         
-        try:
-            subprocess.run([
-                "hf", "download",
-                selected_model["repo_id"],
-                selected_model["filename"],
-                "--local-dir", model_dir
-            ], check=True)
-            print(f"✅ Model downloaded to {model_path}")
-        except subprocess.CalledProcessError:
-            print(f"❌ Download failed. Check repo_id and filename.")
-            print(f"   Repo: {selected_model['repo_id']}")
-            print(f"   File: {selected_model['filename']}")
-            return
-    else:
-        print(f"✅ Model already cached: {model_path}")
-    
-    # --- EXA Search Check ---
-    exa_key = get_exa_api_key()
-    if exa_key:
-        print("✅ EXA Search API key found")
-        use_exa = True
-    else:
-        print("⚠️  EXA Search API key not found. Web search disabled.")
-        print("   Add 'exa-api-key' secret to Modal to enable.")
-        use_exa = False
-    
-    # --- Start llama-server with GPU optimizations ---
-    model_settings = selected_model.get('settings', {})
-    
-    server_cmd = [
-        "llama-server",
-        "-m", model_path,
-        "--host", "0.0.0.0",
-        "--port", "8080",
-        "--ctx-size", "32768",
-        "--batch-size", "512",
-        "-ngl", "99",         # Offload all layers to GPU
-        "-fa", "on",          # Flash Attention
-        "-ctk", "q8_0",       # Key cache quantization
-        "-ctv", "q8_0",       # Value cache quantization
-        "--jinja",
-        "--temp", str(model_settings.get('temp', 0.7)),
-        "--top-p", str(model_settings.get('top_p', 0.9)),
-        "--top-k", str(model_settings.get('top_k', 40)),
-    ]
-    
-    print(f"\n🚀 Starting GPU-accelerated llama-server for {selected_model['name']}...")
-    print(f"   GPU: T4 (all layers offloaded)")
-    print(f"   Settings: temp={model_settings.get('temp', 0.7)}, top_p={model_settings.get('top_p', 0.9)}")
-    print(f"   Context: 32K with KV cache quantization")
-    
-    # Start server in background
-    server_process = subprocess.Popen(
-        server_cmd,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.PIPE
-    )
-    
-    # Wait for server to be ready
-    time.sleep(3)
-    for i in range(30):
-        try:
-            resp = httpx.get("http://localhost:8080/health", timeout=1.0)
-            if resp.status_code == 200:
-                print("✅ llama-server ready!")
-                break
-        except:
-            pass
-        time.sleep(1)
-    else:
-        print("❌ llama-server failed to start. Check model file.")
+        print(f"\n\n⏰ Idle timeout reached ({LLAMACPP_IDLE_TIMEOUT}s). Shutting down.")
         server_process.terminate()
-        return
-    
-    # --- Start EXA Proxy (if enabled) ---
-    if use_exa:
-        from exa_proxy import start_exa_proxy
-        print("  Starting EXA Search proxy...")
-        start_exa_proxy(port=8081, target_port=8080)
-        web_port = 8081
-    else:
-        web_port = 8080
-    
-    # --- SSH Setup ---
-    inject_ssh_key()
-    subprocess.run(["/usr/sbin/sshd"])
-    
-    # --- Port Forwarding ---
-    with modal.forward(22, unencrypted=True) as ssh_tunnel:
-        ssh_command = f"ssh root@{ssh_tunnel.host} -p {ssh_tunnel.unencrypted_port}"
-    
-    with modal.forward(web_port, unencrypted=True) as web_tunnel:
-            web_url = f"http://{web_tunnel.host}:{web_tunnel.unencrypted_port}"
-            
-            print("\n" + "="*60)
-            print("🚀 Your GPU llama.cpp Research Center is ready!")
-            print("="*60)
-            print(f"\n🌐 WebUI: {web_url}")
-            print(f"   (Open in browser for chat interface)")
-            print(f"\n🔐 SSH: {ssh_command}")
-            print(f"\n🧠 Model: {selected_model['name']} ({selected_model['size']})")
-            print(f"🎮 GPU: T4 (all layers offloaded)")
-            if use_exa:
-                print(f"🔍 EXA Search: Enabled (function calling)")
-            print(f"\n⏰ Idle timeout: {LLAMACPP_IDLE_TIMEOUT // 60} minutes")
-            print("\n" + "="*60)
-            
-            # --- Idle Monitor ---
-            idle_time = 0
-            check_interval = 30
-            
-            while idle_time < LLAMACPP_IDLE_TIMEOUT:
-                time.sleep(check_interval)
-                
-                # Check for active SSH sessions
-                ssh_result = subprocess.run(
-                    "ps -ef | grep 'sshd: root@' | grep -v grep",
-                    shell=True,
-                    capture_output=True,
-                )
-                
-                # Check for active WebUI connections
-                web_active = False
-                try:
-                    stats = httpx.get("http://localhost:8080/health", timeout=1.0)
-                    web_active = True
-                except:
-                    pass
-                
-                if ssh_result.stdout or web_active:
-                    idle_time = 0
-                else:
-                    idle_time += check_interval
-                    remaining = LLAMACPP_IDLE_TIMEOUT - idle_time
-                    print(f"\r💤 No activity. Shutting down in {remaining // 60}m {remaining % 60}s...", end="", flush=True)
-            
-            print(f"\n\n⏰ Idle timeout reached ({LLAMACPP_IDLE_TIMEOUT}s). Shutting down.")
-            server_process.terminate()
-# Menu-driven local entrypoint.
-@app.local_entrypoint()
-def main():
-  
-    from ui_utils import create_box, show_spinner
-    from quotes_loader import get_random_quote, format_quote
-    from utils import inject_ssh_key, display_system_info
-    from config import IDLE_TIMEOUT_SECONDS
-    from gpu_utils import get_gpu_config, get_available_gpus
 
-    banner = """
+
+@app.function(image=llamacpp_cpu_image, enable_memory_snapshot=True, **llamacpp_devbox_args)
+def launch_llamacpp_playroom(model_choice: str = "1", repo_id: str = "", filename: str = ""):
+    """llama.cpp Research Center with curated models, WebUI, and EXA Search."""
+    run_llamacpp_playroom(model_choice, repo_id, filename)
+
+@app.function(image=llamacpp_cpu_image, enable_memory_snapshot=True, **llamacpp_gpu_devbox_args)
+def launch_llamacpp_playroom_gpu(model_choice: str = "1", repo_id: str = "", filename: str = ""):
+    """GPU-accelerated llama.cpp Research Center with curated models, WebUI, and EXA Search."""
+    run_llamacpp_playroom(model_choice, repo_id, filename, gpu_name=LLAMACPP_GPU_DEVBOX_ARGS["gpu"].upper())
+
+# Static launcher screens, built once at import
+LAUNCHER_BANNER = """
 ╔══════════════════════════════════════════════════════════╗
 ║                                                          ║
 ║            🚀  DEVBOX LAUNCHER  🚀                ║
@@ -604,19 +549,13 @@ def main():
 ║                                                          ║
 ╚══════════════════════════════════════════════════════════╝
 """
-    print(banner)
 
-    quote = get_random_quote()
-    quote_box = format_quote(quote)
-    create_box(quote_box, "💭 Programming Wisdom")
-    display_system_info()
-
-    menu_box = """
+LAUNCH_MENU = """
     🎯 Choose your DevBox Config:
     1. 🛠️  Standard DevBox general purpose development environment with optional extra packages
     
     2. 📄 Document Processing Box
-    Pandoc + Full TeX Live for document work
+    Pandoc + TeX Live (LaTeX, XeTeX, LuaTeX) for document work
     
     3. 🤖 AI Assistants Box
     Includes OpenCode and Gemini CLI
@@ -635,13 +574,44 @@ def main():
     8. 🚀 llama.cpp Research Center (GPU)
     GPU-accelerated inference + 32K context + T4 GPU
     """
-    create_box(menu_box, "🚀 LAUNCH OPTIONS")
-    
-    try:
-      choice = input("Enter your choice (1-8): ").strip()
-    except EOFError:
-      print("\nNo input received. Exiting.")
-      return
+
+# Menu-driven local entrypoint.
+@app.local_entrypoint()
+def main(type: int = 0, gpu: str = "", packages: str = ""):
+    """
+    Launch a DevBox from the interactive menu, or straight from CLI flags.
+
+    Passing --type skips every prompt, e.g.
+    modal run devbox.py --type=1 --gpu=t4 --packages="htop tmux"
+
+    Args:
+        type: Menu choice (1-8); 0 shows the interactive menu
+        gpu: t4, l4 or a10g for the Standard/RDP boxes; empty for CPU-only
+        packages: Space-separated extra packages for the Standard/RDP boxes
+    """
+    scripted = type != 0
+
+    from ui_utils import create_box, show_status
+    from quotes_loader import get_random_quote, format_quote
+    from utils import display_system_info
+
+    print(LAUNCHER_BANNER)
+
+    quote = get_random_quote()
+    quote_box = format_quote(quote)
+    create_box(quote_box, "💭 Programming Wisdom")
+    display_system_info()
+
+    if scripted:
+      choice = str(type)
+    else:
+      create_box(LAUNCH_MENU, "🚀 LAUNCH OPTIONS")
+      
+      try:
+        choice = input("Enter your choice (1-8): ").strip()
+      except EOFError:
+        print("\nNo input received. Exiting.")
+        return
       
     print(choice)
     if choice == "1": #remember to adjust subsequent indents at package_selction
@@ -650,13 +620,16 @@ def main():
       Examples: htop tmux git neovim curl wget
       (leave empty for default setup)
       """
-      create_box(package_box, "🛠️  EXTRA PACKAGES")
-      try:
-        tools_input = input("Enter tools (space-separated): ").strip()
-      except EOFError:
-        tools_input = ""
+      if scripted:
+        tools_input = packages.strip()
+      else:
+        create_box(package_box, "🛠️  EXTRA PACKAGES")
+        try:
+          tools_input = input("Enter tools (space-separated): ").strip()
+        except EOFError:
+          tools_input = ""
 
-      package_list = tools_input.split() if tools_input else []
+      package_list = [PACKAGE_ALIASES.get(p, p) for p in tools_input.split()]
    
       if package_list:
         print(f"✅ Requesting with additional tools: {', '.join(package_list)}")
@@ -673,12 +646,15 @@ def main():
       ⚠️  GPU usage incurs charges on your Modal account.
          See modal.com/pricing for current rates.
       """
-      create_box(gpu_box, "⚡ GPU ACCELERATION")
-      
-      try:
-        gpu_choice = input("Attach GPU? (y/n): ").lower().strip()
-      except EOFError:
-        gpu_choice = "n"
+      if scripted:
+        gpu_choice = "y" if gpu else "n"
+      else:
+        create_box(gpu_box, "⚡ GPU ACCELERATION")
+        
+        try:
+          gpu_choice = input("Attach GPU? (y/n): ").lower().strip()
+        except EOFError:
+          gpu_choice = "n"
 
       if gpu_choice == "y":
         gpu_menu = """
@@ -686,44 +662,41 @@ def main():
         2. 🚀 L4 GPU (More Performant than T4)
         3. 💪 A10G GPU (Higher performance, more VRAM)
         """
-        create_box(gpu_menu, "🎮 SELECT GPU TYPE")
-        try:
-          gpu_type_choice = input("Choose GPU (1-3): ").strip()
-        except EOFError:
-          print("\nNo input received. Exiting.")
-          return
-
-          gpu_types = {
-            "1": ("T4", launch_devbox_t4),
-            "2": ("L4", launch_devbox_l4),
-            "3": ("A10G", launch_devbox_a10g),
-            }
-
-          if gpu_type_choice in gpu_types:
-            gpu_name, launch_func = gpu_types[gpu_type_choice]
-            
-            gpu_launch_box = f"🎯 Launching with {gpu_name} GPU... Silicon Dust 🔥"
-            create_box(gpu_launch_box, f"🚀 {gpu_name} POWERED")
-            show_spinner("Initializing GPU environment", 2)
-            launch_func.remote(extra_packages=package_list)
-          else:
-            print("❌ Invalid GPU choice. Please run again.")
+        if scripted:
+          gpu_type_choice = GPU_FLAG_CHOICES.get(gpu.lower(), "")
+        else:
+          create_box(gpu_menu, "🎮 SELECT GPU TYPE")
+          try:
+            gpu_type_choice = input("Choose GPU (1-3): ").strip()
+          except EOFError:
+            print("\nNo input received. Exiting.")
             return
+
+        if gpu_type_choice in CUDA_DEVBOX_LAUNCHERS:
+          gpu_name, launch_func = CUDA_DEVBOX_LAUNCHERS[gpu_type_choice]
+          
+          gpu_launch_box = f"🎯 Launching with {gpu_name} GPU... Silicon Dust 🔥"
+          create_box(gpu_launch_box, f"🚀 {gpu_name} POWERED")
+          show_status("Initializing GPU environment")
+          launch_func.remote(extra_packages=package_list)
+        else:
+          print("❌ Invalid GPU choice. Please run again.")
+          return
       else:
         cpu_box = """🖥️  Launching CPU-only environment...
         Potatoes Have High Carbohydrates Content 😉
         """
         create_box(cpu_box, "🚀 STANDARD DEVBOX")
-        show_spinner("Preparing your DevBox", 2)
+        show_status("Preparing your DevBox")
         launch_devbox.remote(extra_packages=package_list)
 
     elif choice == "2":
         doc_box = """
         📄 Launching Document Processing Box...
-        📚 Pandoc + Full TeX Live Distribution
+        📚 Pandoc + Curated TeX Live Distribution
         """
         create_box(doc_box, "📄 DOCUMENT PROCESSING")
-        show_spinner("Setting up document tools", 2)
+        show_status("Setting up document tools")
         launch_doc_processor.remote()
 
     elif choice == "3":
@@ -733,7 +706,7 @@ def main():
         🚀 Let's build something amazing together!
         """
         create_box(assistants_box, "🤖 AI ASSISTANTS")
-        show_spinner("Initializing AI assistants", 2)
+        show_status("Initializing AI assistants")
         launch_assisted_coding.remote()
 
     elif choice == "4":
@@ -743,7 +716,7 @@ def main():
         🚀 Ready for AI experimentation!
         """
         create_box(llm_box, "🧠 LLM PLAYROOM")
-        show_spinner("Initializing LLM environment", 2)
+        show_status("Initializing LLM environment")
         launch_llm_playroom.remote()
 
     elif choice == "5":
@@ -752,19 +725,22 @@ def main():
         🖼️  XFCE Desktop Environment + RDP access
         """
         create_box(rdp_box, "🖥️  RDP DESKTOP")
-        show_spinner("Setting up desktop environment", 2)
+        show_status("Setting up desktop environment")
         
         package_box = """
         📦 Want to install additional desktop tools?
         Examples: firefox gedit vscode libreoffice(leave empty for default XFCE setup)
         """
-        create_box(package_box, "🖥️  EXTRA DESKTOP PACKAGES")
-        try:
-          tools_input = input("Enter desktop tools(space-separated): ").strip()
-        except EOFError:
-          tools_input = ""
+        if scripted:
+          tools_input = packages.strip()
+        else:
+          create_box(package_box, "🖥️  EXTRA DESKTOP PACKAGES")
+          try:
+            tools_input = input("Enter desktop tools(space-separated): ").strip()
+          except EOFError:
+            tools_input = ""
 
-        package_list = tools_input.split() if tools_input else []
+        package_list = [PACKAGE_ALIASES.get(p, p) for p in tools_input.split()]
 
         if package_list:
           print(f"✅ Requesting with additional tools: {', '.join(package_list)}")
@@ -781,12 +757,15 @@ def main():
         ⚠️  GPU usage incurs charges on your Modal account.
            See modal.com/pricing for current rates.
         """
-        create_box(gpu_box, "⚡ GPU ACCELERATION")
+        if scripted:
+            gpu_choice = "y" if gpu else "n"
+        else:
+            create_box(gpu_box, "⚡ GPU ACCELERATION")
 
-        try:
-            gpu_choice = input("Attach GPU? (y/n): ").lower().strip()
-        except EOFError:
-            gpu_choice = "n"
+            try:
+                gpu_choice = input("Attach GPU? (y/n): ").lower().strip()
+            except EOFError:
+                gpu_choice = "n"
 
         if gpu_choice == "y":
             gpu_menu = """
@@ -794,26 +773,23 @@ def main():
             2. 🚀 L4 GPU (Newer, more performant than T4)
             3. 💪 A10G GPU (Higher performance, more VRAM)
             """
-            create_box(gpu_menu, "🎮 SELECT GPU TYPE")
-            try:
-                gpu_type_choice = input("Choose GPU (1-3): ").strip()
-            except EOFError:
-                print("\nNo input received. Exiting.")
-                return
-
-            gpu_types = {
-                "1": ("T4", launch_rdp_devbox_t4),
-                "2": ("L4", launch_rdp_devbox_l4),
-                "3": ("A10G", launch_rdp_devbox_a10g),
-            }
+            if scripted:
+                gpu_type_choice = GPU_FLAG_CHOICES.get(gpu.lower(), "")
+            else:
+                create_box(gpu_menu, "🎮 SELECT GPU TYPE")
+                try:
+                    gpu_type_choice = input("Choose GPU (1-3): ").strip()
+                except EOFError:
+                    print("\nNo input received. Exiting.")
+                    return
 
-            if gpu_type_choice in gpu_types:
-                gpu_name, launch_func = gpu_types[gpu_type_choice]
+            if gpu_type_choice in RDP_GPU_LAUNCHERS:
+                gpu_name, launch_func = RDP_GPU_LAUNCHERS[gpu_type_choice]
                 gpu_launch_box = f"""
                 🎯 Launching RDP Desktop with {gpu_name} GPU...
                 """
                 create_box(gpu_launch_box, f"🚀 {gpu_name} POWERED RDP")
-                show_spinner("Initializing GPU RDP environment", 2)
+                show_status("Initializing GPU RDP environment")
                 launch_func.remote(extra_packages=package_list)
             else:
                 print("❌ Invalid GPU choice. Please run again.")
@@ -823,7 +799,7 @@ def main():
             🖥️  Launching RDP Desktop (CPU-only)...
             """
             create_box(cpu_box, "🚀 RDP DESKTOP")
-            show_spinner("Preparing your RDP Desktop", 2)
+            show_status("Preparing your RDP Desktop")
             launch_rdp_devbox.remote(extra_packages=package_list)
 
     elif choice == "6":
@@ -843,15 +819,16 @@ def main():
         • Function calling support
         """
         create_box(research_box, "🔬 LLAMA.CPP RESEARCH CENTER")
-        show_spinner("Preparing research environment", 3)
-        launch_llamacpp_playroom.remote()
+        model_choice, repo_id, filename = ("1", "", "") if scripted else select_llamacpp_model()
+        show_status("Preparing research environment")
+        launch_llamacpp_playroom.remote(model_choice=model_choice, repo_id=repo_id, filename=filename)
  
     elif choice == "7":
         forensics_box = """
         Immerse Yourself Into The Bits.... 01101010101010100101
         """
         create_box(forensics_box, "Forensics Machine")
-        show_spinner("Interleaving Bits... Hold On Tight!", 3)
+        show_status("Interleaving Bits... Hold On Tight")
         launch_forensics_image.remote()
 
     elif choice == "8":
@@ -873,8 +850,9 @@ def main():
         • EXA Search integration
         """
         create_box(research_gpu_box, "🚀 GPU LLAMA.CPP RESEARCH CENTER")
-        show_spinner("Preparing GPU-accelerated environment", 3)
-        launch_llamacpp_playroom_gpu.remote()
+        model_choice, repo_id, filename = ("1", "", "") if scripted else select_llamacpp_model()
+        show_status("Preparing GPU-accelerated environment")
+        launch_llamacpp_playroom_gpu.remote(model_choice=model_choice, repo_id=repo_id, filename=filename)
 
     else:
         error_box = """
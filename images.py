@@ -9,7 +9,9 @@ Author: GoodieHART
 
 import modal
 import os
-from config import CORE_DEV_PACKAGES, EXTENDED_DEV_PACKAGES, LLAMACPP_VERSION, DOWNLOAD_APT_PACKAGES, DOWNLOAD_PIP_PACKAGES
+import shlex
+from persistence_utils import PERSISTENT_STORAGE_DIR, SSH_PERSISTENCE_ITEMS, RDP_PERSISTENCE_ITEMS
+from config import CORE_DEV_PACKAGES, EXTENDED_DEV_PACKAGES, DOC_PROCESSING_PACKAGES, LLAMACPP_VERSION, NODE_VERSION, DOWNLOAD_APT_PACKAGES, DOWNLOAD_PIP_PACKAGES, COMMON_EXTRA_PACKAGES, PREBAKED_PACKAGES_ENV
 
 # Absolute path to the directory containing this file (for add_local_file references)
 _IMAGES_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,10 +20,12 @@ def get_ssh_setup_commands():
     """
     Get standardized SSH setup commands for all DevBox images.
     
+    The steps are chained into a single shell command so they build as one step.
+
     Returns:
         list: SSH configuration commands
     """
-    return [
+    return [" && ".join([
         "mkdir -p /root/.ssh",
         "chmod 700 /root/.ssh", 
         "touch /root/.ssh/authorized_keys",
@@ -32,43 +36,89 @@ def get_ssh_setup_commands():
         "echo 'PasswordAuthentication no' >> /etc/ssh/sshd_config",
         "echo 'PermitRootLogin prohibit-password' >> /etc/ssh/sshd_config",
         "echo 'AuthorizedKeysFile .ssh/authorized_keys' >> /etc/ssh/sshd_config",
+    ])]
+
+
+def get_persistence_link_commands(items=SSH_PERSISTENCE_ITEMS):
+    """
+    Get commands that pre-create the /root -> volume links for persisted items.
+
+    The volume is only mounted at runtime, so the links dangle in the image;
+    setup_persistence then only has to create their targets on boot.
+
+    Args:
+        items: Files under /root to link into PERSISTENT_STORAGE_DIR
+
+    Returns:
+        list: A single chained shell command
+    """
+    home_paths = [os.path.join("/root", item) for item in items]
+    parents = sorted({os.path.dirname(path) for path in home_paths})
+    commands = [
+        f"mkdir -p {' '.join(map(shlex.quote, parents))}",
+        # Defaults the earlier layers put there (e.g. a skel directory) would
+        # otherwise make ln create the link inside them
+        f"rm -rf {' '.join(map(shlex.quote, home_paths))}",
     ]
+    for item, home_path in zip(items, home_paths):
+        volume_path = os.path.join(PERSISTENT_STORAGE_DIR, item)
+        commands.append(f"ln -s {shlex.quote(volume_path)} {shlex.quote(home_path)}")
+    return [" && ".join(commands)]
 
 
-def create_base_devbox_image(python_version="3.10"):
+def get_apt_install_command(*packages):
     """
-    Create base DevBox image with common development tools and SSH setup.
-    
+    Get an apt-get install command that skips recommended packages.
+
+    Modal's apt_install always pulls in Recommends, which can add hundreds of
+    MB of fonts, docs and GUI helpers to a layer. The downloaded .debs are
+    cleaned in the same layer; the package lists are kept so runtime
+    extra_packages installs can skip apt-get update.
+
     Args:
-        python_version: Python version to install (default: "3.10")
-        
+        *packages: Debian package names to install
+
     Returns:
-        modal.Image: Base DevBox image with SSH and core tools
+        str: Shell command for use with run_commands
     """
     return (
-        modal.Image.debian_slim(python_version=python_version)
-        .apt_install(*CORE_DEV_PACKAGES, *EXTENDED_DEV_PACKAGES, *DOWNLOAD_APT_PACKAGES)
-        .pip_install(*DOWNLOAD_PIP_PACKAGES)
-        .run_commands(
-            *get_ssh_setup_commands(),
-            # Install Starship prompt (pinned version)
-            "curl -sSLO https://github.com/starship/starship/releases/download/v1.22.1/starship-x86_64-unknown-linux-gnu.tar.gz",
-            "tar -xzf starship-x86_64-unknown-linux-gnu.tar.gz -C /usr/local/bin/",
-            "rm starship-x86_64-unknown-linux-gnu.tar.gz",
-            # Create starship init script (interactive only)
-            "printf '%s\\n' 'if command -v starship &> /dev/null && [ -t 0 ]; then' '  eval \"$(starship init bash)\"' 'fi' > /etc/profile.d/starship.sh",
-            # Create devbox-banner display script
-            "cat > /etc/profile.d/devbox-banner.sh << 'BANNER_EOF'\n"
-            "if [ -t 0 ] && [ -f /etc/devbox-banner ]; then\n"
-            "  clear\n"
-            "  cat /etc/devbox-banner\n"
-            "  [ -d /data ] && cd /data\n"
-            "fi\n"
-            "BANNER_EOF",
-        )
+        "apt-get update && DEBIAN_FRONTEND=noninteractive "
+        f"apt-get install -y --no-install-recommends {' '.join(map(shlex.quote, packages))}"
+        " && apt-get clean"
     )
 
 
+def get_prebaked_packages():
+    """
+    Get the extra apt packages requested for baking into the images.
+
+    Returns:
+        list: Sorted, de-duplicated names from PREBAKED_PACKAGES_ENV
+    """
+    return sorted(set(os.environ.get(PREBAKED_PACKAGES_ENV, "").split()))
+
+
+def with_prebaked_packages(image):
+    """
+    Add the prebaked package layers to an image.
+
+    COMMON_EXTRA_PACKAGES go in a stable layer of their own; anything from
+    PREBAKED_PACKAGES_ENV is layered on top, so changing it never rebuilds
+    the common layer. Modal caches layers by content and run_devbox_shared
+    skips installed packages, so requests covered by these layers need no
+    apt work at launch.
+
+    Args:
+        image: Image that accepts extra_packages at runtime
+
+    Returns:
+        modal.Image: The image with the prebaked packages installed
+    """
+    image = image.run_commands(get_apt_install_command(*COMMON_EXTRA_PACKAGES))
+    packages = [p for p in get_prebaked_packages() if p not in COMMON_EXTRA_PACKAGES]
+    return image.run_commands(get_apt_install_command(*packages)) if packages else image
+
+
 def create_base_minimal_image(python_version="3.10"):
     """
     Create minimal base image with SSH setup only.
@@ -81,10 +131,11 @@ def create_base_minimal_image(python_version="3.10"):
     """
     return (
         modal.Image.debian_slim(python_version=python_version)
-        .apt_install(*CORE_DEV_PACKAGES, *DOWNLOAD_APT_PACKAGES)
+        .run_commands(get_apt_install_command(*CORE_DEV_PACKAGES, *DOWNLOAD_APT_PACKAGES))
         .pip_install(*DOWNLOAD_PIP_PACKAGES)
         .run_commands(
             *get_ssh_setup_commands(),
+            *get_persistence_link_commands(),
             # Install Starship prompt (pinned version)
             "curl -sSLO https://github.com/starship/starship/releases/download/v1.22.1/starship-x86_64-unknown-linux-gnu.tar.gz",
             "tar -xzf starship-x86_64-unknown-linux-gnu.tar.gz -C /usr/local/bin/",
@@ -103,28 +154,47 @@ def create_base_minimal_image(python_version="3.10"):
     )
 
 
+def create_base_devbox_image(python_version="3.10"):
+    """
+    Create base DevBox image with common development tools and SSH setup.
+
+    Built on top of the minimal base so every image shares its cached
+    layers; only the extended toolchain is added here.
+    
+    Args:
+        python_version: Python version to install (default: "3.10")
+        
+    Returns:
+        modal.Image: Base DevBox image with SSH and core tools
+    """
+    return (
+        create_base_minimal_image(python_version)
+        .run_commands(get_apt_install_command(*EXTENDED_DEV_PACKAGES))
+    )
+
+
 # Standard DevBox images using inheritance
 standard_devbox_image = (
-    create_base_devbox_image()
+    with_prebaked_packages(create_base_devbox_image())
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
         "persistence_utils", "backup_utils", "quotes_loader"
     )
     .add_local_file(os.path.join(_IMAGES_DIR, "quotes.json"), "/etc/quotes.json")
 )
-cuda_devbox_image = (
+_cuda_devbox_base_image = (
     modal.Image.from_registry(
         "nvidia/cuda:12.1.1-devel-ubuntu22.04",
         add_python="3.11"
     )
-    .apt_install(
-        *CORE_DEV_PACKAGES,
-        "nano",
-        "libcudnn9-cuda-12", 
-        "libcudnn9-dev-cuda-12",
-    )
-    .run_commands(*get_ssh_setup_commands())
+    # Heavy, stable cuDNN layer first so edits to the tool list don't reinstall it
+    .run_commands(get_apt_install_command("libcudnn9-cuda-12", "libcudnn9-dev-cuda-12"))
+    .run_commands(get_apt_install_command(*CORE_DEV_PACKAGES))
+    .run_commands(*get_ssh_setup_commands(), *get_persistence_link_commands())
     .pip_install(*DOWNLOAD_PIP_PACKAGES)
+)
+cuda_devbox_image = (
+    with_prebaked_packages(_cuda_devbox_base_image)
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
         "persistence_utils", "backup_utils", "quotes_loader"
@@ -134,7 +204,13 @@ cuda_devbox_image = (
 
 doc_processing_image = (
     create_base_minimal_image()
-    .apt_install("pandoc", "texlive-full")
+    # Curated TeX set covering pandoc's PDF engines instead of texlive-full (~5 GB)
+    .run_commands(
+        get_apt_install_command(*DOC_PROCESSING_PACKAGES),
+        # Package lists stay, like in the other images, so runtime installs of
+        # extra texlive-* packages skip apt-get update
+        "rm -rf /usr/share/doc /usr/share/man",
+    )
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
         "persistence_utils", "backup_utils", "quotes_loader"
@@ -144,15 +220,13 @@ doc_processing_image = (
 
 assisted_coding_image = (
     create_base_minimal_image()
-    .run_commands(
-        # Install Node.js 20.x
-        "curl -fsSL https://deb.nodesource.com/setup_20.x | bash -",
-        "apt-get install -y nodejs",
-        # Install OpenCode and Gemini CLI
+    # Node.js (official prebuilt binaries, no apt repo), Gemini CLI and OpenCode in one layer
+    .run_commands(" && ".join([
+        f"curl -fsSL https://nodejs.org/dist/{NODE_VERSION}/node-{NODE_VERSION}-linux-x64.tar.gz"
+        " | tar -xz -C /usr/local --strip-components=1",
         "npm install -g @google/gemini-cli",
         "curl -fsSL https://opencode.ai/install | bash",
-        *get_ssh_setup_commands()
-    )
+    ]))
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
         "persistence_utils", "backup_utils", "quotes_loader"
@@ -162,16 +236,9 @@ assisted_coding_image = (
 
 llm_playroom_image = (
     create_base_minimal_image()
-    .apt_install(
-        "pciutils",
-        "lshw", 
-        "zstd",
-    )
-    .run_commands(
-        # Install Ollama
-        "curl -fsSL https://ollama.com/install.sh | bash",
-        *get_ssh_setup_commands()
-    )
+    .run_commands(get_apt_install_command("pciutils", "lshw", "zstd"))
+    # Install Ollama
+    .run_commands("curl -fsSL https://ollama.com/install.sh | bash")
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
         "persistence_utils", "backup_utils", "quotes_loader"
@@ -181,11 +248,7 @@ llm_playroom_image = (
 
 llamacpp_cpu_image = (
     create_base_minimal_image()
-    .apt_install(
-        "libssl3",
-        "libcurl4", 
-        "zlib1g",
-    )
+    .run_commands(get_apt_install_command("libssl3", "libcurl4", "zlib1g"))
     .pip_install(
         "exa-py",       
         "openai",
@@ -194,6 +257,8 @@ llamacpp_cpu_image = (
         "huggingface_hub",
         "hf_transfer",
     )
+    # Let `hf download` fetch model files over parallel ranged connections
+    .env({"HF_HUB_ENABLE_HF_TRANSFER": "1"})
     .run_commands(
         # Download and extract prebuilt llama.cpp binaries
         f"curl -L -o /tmp/llama.tar.gz https://github.com/ggml-org/llama.cpp/releases/download/{LLAMACPP_VERSION}/llama-{LLAMACPP_VERSION}-bin-ubuntu-x64.tar.gz",
@@ -206,8 +271,6 @@ llamacpp_cpu_image = (
         "ln -sf /opt/llama.cpp/llama-server /usr/local/bin/llama-server",
         "ln -sf /opt/llama.cpp/llama-bench /usr/local/bin/llama-bench",
         "ln -sf /opt/llama.cpp/llama-mtmd-cli /usr/local/bin/llama-mtmd-cli",
-        
-        *get_ssh_setup_commands()
     )
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
@@ -216,8 +279,9 @@ llamacpp_cpu_image = (
     .add_local_file(os.path.join(_IMAGES_DIR, "quotes.json"), "/etc/quotes.json")
 )
 
-rdp_devbox_image = (
+_rdp_devbox_base_image = (
     create_base_devbox_image()
+    # Desktop keeps Recommends: xfce4 relies on them for a usable session
     .apt_install(
         "xrdp",
         "xfce4", 
@@ -253,8 +317,12 @@ rdp_devbox_image = (
         "mkdir -p /etc/skel/.cache/sessions",
         # Set root password for RDP (needed for desktop)
         'echo "root:devbox123" | chpasswd',
-        *get_ssh_setup_commands()
+        # Desktop configs join the SSH dotfiles already linked by the base image
+        *get_persistence_link_commands(RDP_PERSISTENCE_ITEMS),
     )
+)
+rdp_devbox_image = (
+    with_prebaked_packages(_rdp_devbox_base_image)
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
         "persistence_utils", "backup_utils"
@@ -276,7 +344,6 @@ forensic_analysis_image =  (
     "unzip /tmp/linux.zip -d /opt/forensic_analysis/volatility3/symbols",
     "unzip /tmp/mac.zip -d /opt/forensic_analysis/volatility3/symbols",
     # symbols ought to be moved to volatility's execution directory
-    *get_ssh_setup_commands()
     )
     .add_local_python_source(
         "images", "shared_runtime", "utils", "config",
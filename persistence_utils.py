@@ -6,60 +6,204 @@ Provides configurable persistent storage setup to eliminate code duplication.
 
 import os
 import shutil
+import stat
+import subprocess
 import sys
 
 
+PERSISTENT_STORAGE_DIR = "/data/.config_persistence"
+
+# (volume path, home path) pairs already linked by this process; warm
+# containers run several launches and need not redo them
+_persisted = set()
+
+
+def remove_path(path):
+    """
+    Remove a file, symlink or directory tree, if present.
+
+    A single lstat decides how to remove it; symlinks are unlinked, never
+    followed.
+
+    Args:
+        path (str): Path to remove
+    """
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if stat.S_ISDIR(st.st_mode):
+        shutil.rmtree(path)
+    else:
+        os.unlink(path)
+
+
+def list_directories(paths):
+    """
+    List several directories, one scandir each.
+
+    The returned DirEntry objects carry the file type from the listing, so
+    is_dir()/is_symlink() checks on them cost no further syscalls.
+
+    Args:
+        paths (iterable): Directories to list
+
+    Returns:
+        dict: Directory path -> {entry name: os.DirEntry}; empty for a
+        missing directory
+    """
+    listings = {}
+    for path in paths:
+        try:
+            with os.scandir(path) as it:
+                listings[path] = {entry.name: entry for entry in it}
+        except FileNotFoundError:
+            listings[path] = {}
+    return listings
+
+
+def get_mount_points():
+    """
+    Get the paths with something mounted on them.
+
+    Read from /proc/self/mountinfo, because a bind mount from the same
+    filesystem is indistinguishable from a plain directory by stat alone.
+
+    Returns:
+        set: Mount point paths
+    """
+    try:
+        with open("/proc/self/mountinfo") as f:
+            # Field 5 is the mount point, with spaces etc. octal-escaped
+            return {
+                line.split()[4].encode().decode("unicode_escape")
+                for line in f
+            }
+    except OSError:
+        return set()
+
+
+def _skip_mount_holder(home_path):
+    """
+    Report a default directory that is, or holds, a mount point.
+
+    Deleting it recursively would cross into the mounted filesystem
+    (possibly the volume), so the item is left alone.
+    """
+    print(f"  ⚠️ Skipped {home_path}: it still holds a mount", file=sys.stderr)
+
+
 def setup_persistence(
-    items_to_persist, persistent_storage_dir="/data/.config_persistence"
+    items_to_persist, persistent_storage_dir=PERSISTENT_STORAGE_DIR
 ):
     """
     Set up persistent dotfiles and configs using symbolic links.
 
+    Only symlinks are used, never bind mounts: restore_backup extracts with
+    tar --recursive-unlink, which fails on a mount point inside /root.
+
     Args:
-        items_to_persist (list): List of files/directories to persist
+        items_to_persist (tuple): Files/directories to persist
         persistent_storage_dir (str): Base directory for persistent storage
     """
     # --- Set up persistent dotfiles and desktop configs using symbolic links ---
     print("Linking persistent configuration files...", file=sys.stderr)
 
-    os.makedirs(persistent_storage_dir, exist_ok=True)
+    paths = [
+        (os.path.join(persistent_storage_dir, item), os.path.join("/root", item))
+        for item in items_to_persist
+    ]
+    paths = [pair for pair in paths if pair not in _persisted]
+    if not paths:
+        print("...already linked.", file=sys.stderr)
+        return
 
-    for item in items_to_persist:
-        # Determine paths
-        volume_path = os.path.join(persistent_storage_dir, item)
-        home_path = os.path.join("/root", item)
+    # Create every parent directory, on the volume and under /root, once up
+    # front; items share most of them (/root, .ssh, .config, ...)
+    parents = {persistent_storage_dir}
+    for volume_path, home_path in paths:
+        parents.add(os.path.dirname(volume_path))
+        parents.add(os.path.dirname(home_path))
+    # Shallowest first, so each is usually one mkdir on an existing parent
+    # (makedirs only walks up for ancestors outside the set, e.g. .local)
+    for parent in sorted(parents, key=len):
+        try:
+            os.mkdir(parent)
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            os.makedirs(parent, exist_ok=True)
 
-        # Create parent directory in volume if needed
-        if os.path.dirname(volume_path):
-            os.makedirs(os.path.dirname(volume_path), exist_ok=True)
+    # One directory listing per parent answers what exists on both sides,
+    # instead of a stat per item
+    entries = list_directories(parents)
 
-        # Ensure the target exists before creating symlink
-        if not os.path.exists(volume_path):
-            if os.path.isdir(home_path):
+    # Ensure every target exists on the volume, and collect default directories
+    # in the way of a link. Never delete through a mount point
+    mount_points = get_mount_points()
+    stale_dirs = []
+    mounted = set()
+    # home path -> what sits there: None, "dir", "link" or "file", taken
+    # from the listings
+    kinds = {}
+    for volume_path, home_path in paths:
+        home_dir, home_name = os.path.split(home_path)
+        home_entry = entries[home_dir].get(home_name)
+        if home_entry is None:
+            home_kind = None
+        elif home_entry.is_symlink():
+            home_kind = "link"
+        elif home_entry.is_dir(follow_symlinks=False):
+            home_kind = "dir"
+        else:
+            home_kind = "file"
+        volume_dir, volume_name = os.path.split(volume_path)
+        if volume_name not in entries[volume_dir]:
+            if home_kind == "dir":
                 os.makedirs(volume_path, exist_ok=True)
             else:
                 # Create empty file at target location
                 open(volume_path, "a").close()
-
-        # If a default file/dir exists at destination, remove it to allow symlink
-        if os.path.lexists(home_path):
-            if os.path.isdir(home_path) and not os.path.islink(home_path):
-                shutil.rmtree(home_path)
+        if home_kind == "dir":
+            if home_path in mount_points:
+                mounted.add(home_path)
             else:
-                os.remove(home_path)
+                stale_dirs.append(home_path)
+                home_kind = None  # Removed below
+        kinds[home_path] = home_kind
+
+    # One native rm for all of them instead of a Python rmtree walk per item
+    if stale_dirs:
+        subprocess.run(["rm", "-rf", "--one-file-system", *stale_dirs], check=False)
 
-        # Ensure parent directory exists at home_path before symlinking
-        os.makedirs(os.path.dirname(home_path), exist_ok=True)
+    for volume_path, home_path in paths:
+        home_kind = kinds[home_path]
+        if home_path in mounted:
+            _skip_mount_holder(home_path)
+            continue
+        # Links baked into the image (or left by an earlier run) are already right
+        if home_kind == "link" and os.readlink(home_path) == volume_path:
+            _persisted.add((volume_path, home_path))
+            continue
 
-        # Create symbolic link from home directory to persistent volume
-        os.symlink(volume_path, home_path)
+        # Create symbolic link from home directory to persistent volume,
+        # replacing a stale link or default file (one unlink, no lstat)
+        if home_kind is not None:
+            os.unlink(home_path)
+        try:
+            os.symlink(volume_path, home_path)
+        except FileExistsError:
+            _skip_mount_holder(home_path)
+            continue
         print(f"  - Linked {home_path} -> {volume_path}", file=sys.stderr)
+        _persisted.add((volume_path, home_path))
 
     print("...done linking files.", file=sys.stderr)
 
 
-# Standard persistence configurations for different DevBox types
-SSH_PERSISTENCE_ITEMS = [
+# Standard persistence configurations for different DevBox types (tuples, so
+# flavours share one immutable instance instead of rebuilding lists per launch)
+SSH_PERSISTENCE_ITEMS = (
     ".bash_history",
     ".bashrc",
     ".profile",
@@ -68,33 +212,33 @@ SSH_PERSISTENCE_ITEMS = [
     ".gitconfig",
     ".ssh/config",
     ".ssh/known_hosts",
-]
+)
 
-RDP_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + [
+RDP_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + (
     # Desktop-specific configs
     ".config/xfce4",
     ".local/share/xfce4",
     ".cache/sessions",
     "Desktop",
     ".xsession",
-]
+)
 
-GEMINI_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + [
+GEMINI_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + (
     # Gemini-specific configs
-    ".config/gemini"
-]
+    ".config/gemini",
+)
 
-LLM_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + [
+LLM_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + (
     # LLM playroom specific configs
     ".config/llm",
     ".models",
-]
+)
 
-UNSLOTH_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + [
+UNSLOTH_PERSISTENCE_ITEMS = SSH_PERSISTENCE_ITEMS + (
     # Unsloth specific configs
     ".config/unsloth",
     ".models/unsloth",
-]
+)
 
 
 def get_persistence_items(devbox_type="ssh"):
@@ -105,7 +249,7 @@ def get_persistence_items(devbox_type="ssh"):
         devbox_type (str): Type of DevBox ('ssh', 'rdp', 'gemini', 'llm', 'unsloth')
 
     Returns:
-        list: Items to persist for the specified DevBox type
+        tuple: Items to persist for the specified DevBox type
     """
     persistence_configs = {
         "ssh": SSH_PERSISTENCE_ITEMS,
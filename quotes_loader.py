@@ -7,21 +7,25 @@ Provides error handling and fallback quotes for robust operation.
 Author: GoodieHART
 """
 
+import functools
 import json
-import random
 import os
-from typing import Dict, List, Optional
+import time
+from typing import Dict, Optional, Tuple
 
 
-def load_quotes(quotes_file: str = "quotes.json") -> List[Dict[str, str]]:
+@functools.lru_cache(maxsize=None)
+def load_quotes(quotes_file: str = "quotes.json") -> Tuple[Dict[str, str], ...]:
     """
     Load programming quotes from JSON file with error handling and fallback.
+
+    The file is parsed once per path; later calls return the cached tuple.
     
     Args:
         quotes_file: Path to the quotes JSON file (default: "quotes.json")
         
     Returns:
-        List of quote dictionaries with 'text' and 'author' keys
+        Tuple of quote dictionaries with 'text' and 'author' keys
     """
     fallback_quotes = [
         {"text": "Code is like humor. When you have to explain it, it's bad.", "author": "Cory House"},
@@ -50,16 +54,19 @@ def load_quotes(quotes_file: str = "quotes.json") -> List[Dict[str, str]]:
                 if not isinstance(quote, dict) or 'text' not in quote or 'author' not in quote:
                     break
             else:
-                return quotes
+                return tuple(quotes)
         except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
             continue
     
-    return fallback_quotes
+    return tuple(fallback_quotes)
 
 
 def get_random_quote(quotes_file: str = "quotes.json") -> Dict[str, str]:
     """
     Get a random programming quote from the loaded quotes.
+
+    The quote is decorative, so the clock's nanoseconds pick it instead of
+    the random module.
     
     Args:
         quotes_file: Path to the quotes JSON file (default: "quotes.json")
@@ -68,7 +75,7 @@ def get_random_quote(quotes_file: str = "quotes.json") -> Dict[str, str]:
         A random quote dictionary with 'text' and 'author' keys
     """
     quotes = load_quotes(quotes_file)
-    return random.choice(quotes)
+    return quotes[time.time_ns() % len(quotes)]
 
 
 def format_quote(quote: Dict[str, str]) -> str:
@@ -7,16 +7,57 @@ DevBox types, including persistence setup, backup handling, and idle monitoring.
 Author: GoodieHART
 """
 
+import ctypes
+import mmap
 import modal
+import os
+import select
+import socket
+import struct
+import subprocess
 import sys
 import time
 import atexit
 import textwrap
-from persistence_utils import setup_persistence, get_persistence_items
+from persistence_utils import setup_persistence, get_persistence_items, get_mount_points, remove_path
 from backup_utils import restore_backup, register_custom_backup
 from utils import inject_ssh_key
-from config import IDLE_TIMEOUT_SECONDS
-from quotes_loader import get_random_quote
+from config import IDLE_TIMEOUT_SECONDS, IDLE_CHECK_MIN_INTERVAL, IDLE_CHECK_MAX_INTERVAL, ROOT_BACKUP_FILE, APT_CACHE_DIR, SSHD_READY_TIMEOUT, SSH_CLIENT_ALIVE_INTERVAL, BACKUP_SYNC_INTERVAL
+from quotes_loader import get_random_quote, load_quotes
+
+# Parse the quotes at import so memory-snapshotted containers restore with
+# them already loaded (load_quotes is cached)
+load_quotes()
+
+BANNER_RULE = "=" * 60
+
+# Printed connect command; the ControlMaster options let later ssh/scp/IDE
+# connections to the same box reuse the first connection instead of
+# repeating the handshake
+SSH_COMMAND_TEMPLATE = (
+    "ssh -o ControlMaster=auto -o ControlPath=~/.ssh/cm-%r@%h:%p "
+    "-o ControlPersist=600 root@{host} -p {port}"
+)
+
+# glibc struct utmp on Linux x86_64 (384 bytes); ut_type 7 is USER_PROCESS
+UTMP_RECORD = struct.Struct("hi32s4s32s256shhiii4i20s")
+UTMP_USER_PROCESS = 7
+UTMP_FILE = "/var/run/utmp"
+
+# inotify event mask for "file contents written" (sys/inotify.h)
+IN_MODIFY = 0x2
+
+# Kernel TCP socket tables; state 01 is ESTABLISHED
+TCP_TABLES = ("/proc/net/tcp", "/proc/net/tcp6")
+TCP_ESTABLISHED = "01"
+
+RDP_PORT = 3389
+
+# Desktop state reset on every RDP launch
+XFCE_RESET_DIRS = ("/root/.config/xfce4", "/root/.cache/sessions")
+
+# Package indexes from the image's last apt-get update
+APT_LISTS_DIR = "/var/lib/apt/lists"
 
 DEVBOX_BANNERS = {
     "standard_devbox": ("🛠️", "Standard DevBox"),
@@ -30,20 +71,462 @@ DEVBOX_BANNERS = {
 }
 
 
-def run_devbox_shared(extra_packages=None, devbox_type="ssh"):
-    """Single consolidated function for all SSH DevBoxes."""
-    import os
-    import subprocess
+def count_utmp_sessions(utmp_file=UTMP_FILE):
+    """
+    Count interactive (pty) login sessions recorded in utmp.
+
+    Args:
+        utmp_file: Path to the utmp database (default: /var/run/utmp)
+
+    Returns:
+        int: Number of USER_PROCESS records on a pts/ line, 0 if utmp is unavailable
+    """
+    try:
+        # Map instead of read: records are unpacked straight from the page cache
+        with open(utmp_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            usable = len(mm) - len(mm) % UTMP_RECORD.size
+            with memoryview(mm)[:usable] as records:
+                return sum(
+                    1 for record in UTMP_RECORD.iter_unpack(records)
+                    if record[0] == UTMP_USER_PROCESS and record[2].startswith(b"pts/")
+                )
+    except (OSError, ValueError):
+        return 0  # Missing or empty utmp (an empty file cannot be mapped)
+
+
+def open_utmp_watch(utmp_file=UTMP_FILE):
+    """
+    Start watching utmp for login/logout records via inotify.
+
+    Python has no inotify binding, so libc is called through ctypes.
+
+    Args:
+        utmp_file: Path to the utmp database
+
+    Returns:
+        int | None: inotify file descriptor, or None if utmp or inotify is
+        unavailable
+    """
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(utmp_file), IN_MODIFY) < 0:
+        os.close(fd)  # No utmp in this container
+        return None
+    return fd
+
+
+def get_child_pids(pid):
+    """
+    Get the direct children of a process.
+
+    Args:
+        pid: Parent process ID
+
+    Returns:
+        list: Child PIDs; empty if the kernel does not expose them
+    """
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def open_pidfds(pids):
+    """
+    Open a pidfd per process; each becomes readable when its process exits.
+
+    Args:
+        pids: Process IDs to watch
+
+    Returns:
+        list: Open pidfds (processes that already exited are skipped)
+    """
+    pidfds = []
+    for pid in pids:
+        try:
+            pidfds.append(os.pidfd_open(pid))
+        except (OSError, AttributeError):
+            continue  # Exited meanwhile, or no pidfd support
+    return pidfds
 
-    restore_backup()
+
+def wait_for_session_change(watch_fd, timeout, pidfds=()):
+    """
+    Sleep up to timeout seconds, waking early when a session starts or ends.
+
+    Args:
+        watch_fd: Descriptor from open_utmp_watch(), or None
+        timeout: Longest time to wait, in seconds
+        pidfds: pidfds of session processes, readable once one exits
+    """
+    fds = [*pidfds] if watch_fd is None else [watch_fd, *pidfds]
+    if not fds:
+        time.sleep(timeout)
+        return
+    if watch_fd in select.select(fds, [], [], timeout)[0]:
+        try:
+            os.read(watch_fd, 4096)  # Drain the queued events
+        except BlockingIOError:
+            pass
+
+
+def count_established_connections(*ports, tables=TCP_TABLES):
+    """
+    Count established inbound TCP connections to local ports.
+
+    Args:
+        *ports: Local ports to match
+        tables: Kernel socket tables to read
+
+    Returns:
+        int | None: Connection count, or None if no table could be read
+    """
+    local_suffixes = tuple(f":{port:04X}" for port in ports)
+    count = None
+    for table in tables:
+        try:
+            with open(table) as f:
+                next(f, None)  # Column header
+                count = (count or 0) + sum(
+                    1 for line in f
+                    if (fields := line.split())[3] == TCP_ESTABLISHED
+                    and fields[1].endswith(local_suffixes)
+                )
+        except OSError:
+            continue  # e.g. no IPv6 in this container
+    return count
+
+
+def has_process(marker):
+    """
+    Check whether any running process has marker in its command line.
+
+    Reads /proc/<pid>/cmdline directly instead of forking ps/grep, stopping
+    at the first match.
+
+    Args:
+        marker: Bytes to look for, e.g. b"sshd: root@"
+
+    Returns:
+        bool: True if a matching process exists
+    """
+    # One scandir of /proc; str.isdigit is cheaper than glob's fnmatch
+    with os.scandir("/proc") as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/cmdline", "rb") as f:
+                    if marker in f.read():
+                        return True
+            except OSError:
+                continue  # Process exited while scanning
+    return False
+
+
+def has_ssh_session():
+    """
+    Check whether any SSH login session is currently open.
+
+    An established connection to port 22 alone proves nothing: scanners and
+    brute-force attempts on the public tunnel hold one too. So the kernel's
+    TCP tables only serve as a cheap early-out when nothing is connected.
+    Authenticated sessions are then answered from utmp (interactive logins)
+    or, for scp/sftp/port-forwarding sessions without a pty, from the
+    ``sshd: root@`` process title sshd sets after login.
+
+    Returns:
+        bool: True if at least one root SSH session is active
+    """
+    if count_established_connections(22) == 0:
+        return False
+    if count_utmp_sessions():
+        return True
+    return has_process(b"sshd: root@")
+
+
+def has_rdp_session():
+    """
+    Check whether any RDP client is connected.
+
+    Like has_ssh_session, the TCP tables only rule out a session when no
+    client is connected to the RDP port; a logged-in session is recognised
+    by its ``xrdp-chansrv`` helper, which xrdp starts only after login.
+
+    Returns:
+        bool: True if at least one RDP session is active
+    """
+    if count_established_connections(RDP_PORT) == 0:
+        return False
+    return has_process(b"xrdp-chansrv")
+
+
+def get_installed_packages(packages):
+    """
+    Find which of the given apt packages are already installed.
+
+    Args:
+        packages: Package names to check
+
+    Returns:
+        set: Names from packages that dpkg reports as installed
+    """
+    # Unknown names only add an error on stderr; known ones are still listed
+    result = subprocess.run(
+        ["dpkg-query", "-W", "-f=${Package} ${db:Status-Status}\n", *packages],
+        capture_output=True, text=True,
+    )
+    return {
+        line.split()[0] for line in result.stdout.splitlines()
+        if line.endswith(" installed")
+    }
+
+
+def has_apt_lists(lists_dir=APT_LISTS_DIR):
+    """
+    Check whether apt package indexes are present.
+
+    Images that delete /var/lib/apt/lists to save space have none, and an
+    install attempt without them is bound to fail.
+
+    Args:
+        lists_dir: apt's package list directory
+
+    Returns:
+        bool: True if at least one Packages index exists
+    """
+    try:
+        return any("_Packages" in name for name in os.listdir(lists_dir))
+    except OSError:
+        return False
+
+
+def install_extra_packages(extra_packages):
+    """
+    Install user-requested apt packages with a single shell invocation.
+
+    Packages already present (e.g. prebaked into the image) are skipped, so a
+    fully prebaked set never touches apt at runtime.
+
+    Args:
+        extra_packages: Package names to install
+    """
+    installed = get_installed_packages(extra_packages)
+    extra_packages = [p for p in extra_packages if p not in installed]
+    if not extra_packages:
+        print("Extra packages already installed in the image.", file=sys.stderr)
+        return
+    print(f"Installing extra packages: {', '.join(extra_packages)}...", file=sys.stderr)
+    # Keep downloaded archives on the volume so repeat launches skip the download
+    os.makedirs(os.path.join(APT_CACHE_DIR, "partial"), exist_ok=True)
+    install_cmd = [
+        "apt-get", "install", "-y", "--no-install-recommends",
+        "-o", f"Dir::Cache::Archives={APT_CACHE_DIR}", *extra_packages,
+    ]
+    env = {**os.environ, "DEBIAN_FRONTEND": "noninteractive"}
+    # The image's package lists are usually good enough; refresh only when
+    # they were stripped from the image or the install fails with them
+    if has_apt_lists():
+        if subprocess.run(install_cmd, env=env).returncode == 0:
+            return
+        print("Install failed with cached package lists, running apt-get update...", file=sys.stderr)
+    else:
+        print("No package lists in the image, running apt-get update...", file=sys.stderr)
+    subprocess.run(["apt-get", "update", "-qq"], check=True, env=env)
+    subprocess.run(install_cmd, check=True, env=env)
+
+
+def spawn_service(argv, **kwargs):
+    """
+    Start a long-running service process.
+
+    With an absolute executable path and close_fds=False, CPython launches
+    the child with posix_spawn (vfork) instead of its fork + close-every-fd
+    path. Descriptors Python opens are non-inheritable, so nothing leaks.
+
+    Args:
+        argv: Command line; argv[0] must be an absolute path
+        **kwargs: Extra subprocess.Popen arguments
+
+    Returns:
+        subprocess.Popen: The started process
+    """
+    return subprocess.Popen(argv, close_fds=False, **kwargs)
+
+
+def start_sshd(_timeout=SSHD_READY_TIMEOUT):
+    """
+    Start sshd in the foreground and wait until it accepts connections.
+
+    Running with ``-D`` keeps sshd a child of this process, so it can be
+    supervised and stopped on exit, and the port probe makes sure the tunnel
+    never opens ahead of the listener. Client keepalives make sshd drop
+    connections whose client vanished, so they stop counting as sessions.
+
+    Returns:
+        subprocess.Popen: The running sshd process
+    """
+    proc = spawn_service([
+        "/usr/sbin/sshd", "-D", "-e",
+        "-o", f"ClientAliveInterval={SSH_CLIENT_ALIVE_INTERVAL}",
+        "-o", "ClientAliveCountMax=3",
+    ])
+    atexit.register(proc.terminate)
+    deadline = time.monotonic() + _timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", 22), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        print(f"⚠️ sshd not accepting connections after {_timeout}s", file=sys.stderr)
+    return proc
+
+
+def wait_until_idle(
+    is_active,
+    label,
+    timeout=IDLE_TIMEOUT_SECONDS,
+    on_wake=None,
+    session_pids=None,
+    _min_interval=IDLE_CHECK_MIN_INTERVAL,
+    _max_interval=IDLE_CHECK_MAX_INTERVAL,
+    _wait=wait_for_session_change,
+    _clock=time.monotonic,
+):
+    """
+    Block until is_active() has reported no session for timeout seconds.
+
+    Checks back off while nothing changes, and between checks the loop
+    blocks on utmp and on pidfds of the session processes, so a login or
+    logout is noticed as soon as it happens rather than at the next
+    backed-off check.
+
+    The underscore arguments bind the loop's globals as locals once at
+    definition time; callers should not pass them.
+
+    Args:
+        is_active: Callable returning True while someone is connected
+        label: Service named in the status messages, e.g. "SSH"
+        timeout: Idle seconds before returning
+        on_wake: Optional callable run before every check
+        session_pids: Optional callable returning the PIDs whose exit ends a session
+    """
+    watch_fd = open_utmp_watch()
+    idle_time = 0
+    check_interval = _min_interval
+    was_active = False
+    while idle_time < timeout:
+        started = _clock()
+        pidfds = open_pidfds(session_pids()) if session_pids else []
+        try:
+            # Never sleep past the shutdown deadline
+            _wait(watch_fd, min(check_interval, timeout - idle_time), pidfds)
+        finally:
+            for pidfd in pidfds:
+                os.close(pidfd)
+        slept = _clock() - started
+        if on_wake is not None:
+            on_wake()
+        active = is_active()
+        print(f"[DEBUG] {label} session check: {active}", file=sys.stderr)
+        print(f"[DEBUG] Current idle time: {idle_time:.0f}s", file=sys.stderr)
+
+        # Poll quickly right after a connect/disconnect, back off while steady
+        if active != was_active:
+            check_interval = _min_interval
+        else:
+            check_interval = min(check_interval * 2, _max_interval)
+        was_active = active
+
+        if active:
+            idle_time = 0
+            print("[DEBUG] User Connected. Resetting idle timer.", file=sys.stderr)
+        else:
+            idle_time += slept
+            remaining = timeout - idle_time
+            print(f"No active {label} connection. Shutting down in {remaining:.0f}s...", file=sys.stderr)
+    if watch_fd is not None:
+        os.close(watch_fd)
+
+
+def _serve_until_idle(banner, sshd=None):
+    """
+    Forward the SSH port and block until no session has been open for
+    IDLE_TIMEOUT_SECONDS.
+
+    Args:
+        banner: Ready message, formatted with the tunnel ``host`` and ``port``
+        sshd: sshd process from start_sshd(); restarted if it exits early
+
+    Returns:
+        subprocess.Popen: The sshd process running at the end, which is a
+        restarted one if the original exited
+    """
+    def keep_sshd_running():
+        nonlocal sshd
+        if sshd is not None and sshd.poll() is not None:
+            print(f"⚠️ sshd exited with code {sshd.returncode}, restarting", file=sys.stderr)
+            sshd = start_sshd()
+
+    with modal.forward(22, unencrypted=True) as tunnel:
+        print(banner.format(host=tunnel.host, port=tunnel.unencrypted_port))
+        wait_until_idle(
+            has_ssh_session, "SSH", on_wake=keep_sshd_running,
+            # sshd forks one child per connection
+            session_pids=lambda: get_child_pids(sshd.pid) if sshd is not None else [],
+        )
+    return sshd
+
+
+# Set once this process has restored /root; Modal reuses warm containers
+_devbox_prepared = False
+
+
+def _line_buffer_stderr():
+    """Make stderr line-buffered; Modal pipes it, so it is block-buffered by default."""
+    if hasattr(sys.stderr, "reconfigure"):
+        sys.stderr.reconfigure(line_buffering=True)
+
+
+def _prepare_devbox(items_to_persist):
+    """
+    Common container setup shared by the SSH and RDP DevBoxes.
+
+    Restores /root from the last backup, links persisted items, registers
+    the exit backup and injects the SSH key. A warm container reused for a
+    later launch skips the restore: its live /root is newer than the
+    archive, which only the periodic backup has written so far.
+
+    Args:
+        items_to_persist: Files/directories under /root to keep on the volume
+    """
+    global _devbox_prepared
+    _line_buffer_stderr()
+
+    if not _devbox_prepared:
+        restore_backup()
+        _devbox_prepared = True
     
-    setup_persistence(get_persistence_items(devbox_type))
+    setup_persistence(items_to_persist)
     
-    # Register backup on exit
-    register_custom_backup("/root", "/data/root_full_backup.tar.gz")
+    # Register backup on exit, refreshed in the background meanwhile
+    register_custom_backup("/root", ROOT_BACKUP_FILE, interval=BACKUP_SYNC_INTERVAL)
     
     inject_ssh_key()
 
+
+def run_devbox_shared(extra_packages=None, devbox_type="ssh"):
+    """Single consolidated function for all SSH DevBoxes."""
+    _prepare_devbox(get_persistence_items(devbox_type))
+
     # Write devbox banner with quote
     icon, name = DEVBOX_BANNERS.get(devbox_type, ("🚀", "DevBox"))
     banner = textwrap.dedent(f"""\
@@ -61,30 +544,13 @@ def run_devbox_shared(extra_packages=None, devbox_type="ssh"):
         f.write(banner)
 
     if extra_packages:
-        print(f"Installing extra packages: {', '.join(extra_packages)}...", file=sys.stderr)
-        subprocess.run(["apt-get", "update"], check=True)
-        subprocess.run(["apt-get", "install", "-y"] + extra_packages, check=True)
+        install_extra_packages(extra_packages)
     
     # Start SSH and monitor
-    subprocess.run(["/usr/sbin/sshd"])
+    sshd = start_sshd()
     
-    with modal.forward(22, unencrypted=True) as tunnel:
-        print(f"\n🚀 Your DevBox is ready!\nssh root@{tunnel.host} -p {tunnel.unencrypted_port}")
-        
-        idle_time = 0
-        check_interval = 15
-        while idle_time < IDLE_TIMEOUT_SECONDS:
-            time.sleep(check_interval)
-            result = subprocess.run("ps -ef | grep 'sshd: root@' | grep -v grep", shell=True, capture_output=True)
-            print(f"[DEBUG] SSH session check: {result.stdout!r}", file=sys.stderr)
-            print(f"[DEBUG] Current idle time: {idle_time}s", file=sys.stderr)
-            if result.stdout:
-                idle_time = 0
-                print("[DEBUG] User Connected. Resetting idle timer.", file=sys.stderr)
-            else:
-                idle_time += check_interval
-                remaining = IDLE_TIMEOUT_SECONDS - idle_time
-                print(f"No active SSH connection. Shutting down in {remaining}s...", file=sys.stderr,)
+    sshd = _serve_until_idle("\n🚀 Your DevBox is ready!\n" + SSH_COMMAND_TEMPLATE, sshd)
+    sshd.terminate()
 
 
 def run_rdp_devbox_shared(extra_packages: list[str] = None):
@@ -92,48 +558,25 @@ def run_rdp_devbox_shared(extra_packages: list[str] = None):
     Shared logic for launching an RDP desktop development environment.
     Sets up public key, persistent dotfiles, installs packages, and runs RDP server.
     """
-    import os
-    import subprocess
-    import time
-    
-    from backup_utils import restore_backup, register_custom_backup
-    from persistence_utils import setup_persistence
-    from utils import inject_ssh_key
-    from config import IDLE_TIMEOUT_SECONDS
-    
-    restore_backup()
-    
-    inject_ssh_key()
-    
-    rdp_items = [
-        ".bash_history", ".bashrc", ".profile", ".viminfo", ".vimrc",
-        ".gitconfig", ".ssh/config", ".ssh/known_hosts",
-        ".config/xfce4", ".local/share/xfce4", ".cache/sessions",
-        "Desktop", ".xsession",
-    ]
-    setup_persistence(rdp_items)
-    
-    register_custom_backup("/root", "/data/root_full_backup.tar.gz")
+    _prepare_devbox(get_persistence_items("rdp"))
     
     if extra_packages:
-        print(f"Installing extra packages: {', '.join(extra_packages)}...", file=sys.stderr)
-        subprocess.run(["apt-get", "update"], check=True)
-        subprocess.run(["apt-get", "install", "-y"] + extra_packages, check=True)
+        install_extra_packages(extra_packages)
     
     # Setup XFCE environment
     # Start D-Bus daemon for xfconfd
-    subprocess.Popen(["dbus-daemon", "--system", "--fork"],
-                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    
-    # Clean and recreate XFCE config directories
-    subprocess.run(["rm", "-rf", "/root/.config/xfce4"], check=False)
-    subprocess.run(["rm", "-rf", "/root/.cache/sessions"], check=False)
-    subprocess.run(["mkdir", "-p", "/root/.config/xfce4"], check=True)
-    subprocess.run(["mkdir", "-p", "/root/.cache/sessions"], check=True)
+    spawn_service(["/usr/bin/dbus-daemon", "--system", "--fork"],
+                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     
-    # Set permissions
-    subprocess.run(["chown", "-R", "root:root", "/root/.config"], check=False)
-    subprocess.run(["chown", "-R", "root:root", "/root/.cache"], check=False)
+    # Clean and recreate XFCE config directories, in-process. They are
+    # persisted items, so the link (or a stray mount) is dropped rather than deleted
+    # through into the volume; root already owns everything recreated here
+    mount_points = get_mount_points()
+    for path in XFCE_RESET_DIRS:
+        if path in mount_points:
+            subprocess.run(["umount", "-l", path], check=False)
+        remove_path(path)
+        os.makedirs(path)
     
     # XDG environment variables
     os.environ.setdefault('XDG_CONFIG_DIRS', '/etc/xdg')
@@ -143,39 +586,20 @@ def run_rdp_devbox_shared(extra_packages: list[str] = None):
     os.chmod('/tmp/xdg-runtime', 0o700)
     
     # Start RDP services
-    subprocess.Popen(["/usr/sbin/xrdp"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    subprocess.Popen(["/usr/sbin/xrdp-sesman"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    spawn_service(["/usr/sbin/xrdp"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    spawn_service(["/usr/sbin/xrdp-sesman"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     
-    with modal.forward(3389, unencrypted=True) as tunnel:
-        print("\n" + "=" * 60)
-        print("🖥️ Your RDP Desktop is ready!")
-        print("=" * 60)
-        print(f"\n📡 RDP Address: {tunnel.host}:{tunnel.unencrypted_port}")
-        print("👤 Username: root")
-        print("🔑 Password: devbox123")
-        print("\n" + "=" * 60)
+    with modal.forward(RDP_PORT, unencrypted=True) as tunnel:
+        print("\n".join((
+            "\n" + BANNER_RULE,
+            "🖥️ Your RDP Desktop is ready!",
+            BANNER_RULE,
+            f"\n📡 RDP Address: {tunnel.host}:{tunnel.unencrypted_port}",
+            "👤 Username: root",
+            "🔑 Password: devbox123",
+            "\n" + BANNER_RULE,
+        )))
         
-        idle_time = 0
-        check_interval = 15
-        
-        while idle_time < IDLE_TIMEOUT_SECONDS:
-            time.sleep(check_interval)
-            
-            # Check for active RDP sessions
-            result = subprocess.run(
-                "ps aux | grep -c 'xrdp-sesman.*:' | grep -v grep", shell=True, capture_output=True, text=True
-            )
-            # remeber to add debug logs to check the output of the command
-            try:
-                active_sessions = int(result.stdout.strip())
-                if active_sessions > 0:
-                    idle_time = 0
-                    print(f"[DEBUG] RDP session check: {active_sessions} {result.stdout!r}", file=sys.stderr)
-                else:
-                    idle_time += check_interval
-                    remaining = IDLE_TIMEOUT_SECONDS - idle_time
-                    print(f"[DEBUG] No active RDP connection. Shutting down in {remaining}s...", file=sys.stderr, end="\r")
-            except (ValueError, AttributeError):
-                idle_time += check_interval
+        wait_until_idle(has_rdp_session, "RDP")
         
         print("\nIdle timeout reached. Shutting down RDP Desktop.", file=sys.stderr)
\ No newline at end of file
@@ -7,20 +7,35 @@ including box creation, spinner animations, and visual feedback utilities.
 Author: GoodieHART
 """
 
+import functools
+import sys
+import threading
 import time
 
+# Braille spinner frames, built once at import
+SPINNER_CHARS = ("⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏")
+SPINNER_INTERVAL = 0.1  # Seconds per frame
+ERASE_LINE = "\x1b[2K"  # ANSI: clear the whole current line
 
-def create_box(content: str, title: str = "", width: int = 60) -> None:
+
+@functools.lru_cache(maxsize=32)
+def render_box(content: str, title: str = "", width: int = 60) -> str:
     """
-    Create a bordered box around content with optional title.
-    
+    Render a bordered box around content with optional title.
+
+    The launcher boxes are almost all constant strings, so the rendered
+    result is cached and reused on repeat calls.
+
     Args:
         content: The text content to display inside the box
         title: Optional title to display in the top border
         width: Minimum width of the box (default: 60)
+
+    Returns:
+        str: The complete box, including a trailing newline
     """
     lines = content.split("\n")
-    max_len = max(len(line) for line in lines) if lines else 0
+    max_len = max(map(len, lines))  # split() always yields at least one line
     box_width = max(max_len + 4, width)
 
     if title:
@@ -31,38 +46,77 @@ def create_box(content: str, title: str = "", width: int = 60) -> None:
     else:
         top_border = "╔" + "═" * box_width + "╗"
 
-    print(top_border)
-
+    rows = [top_border]
     for line in lines:
         padded_line = line.ljust(max_len)
-        print(f"║ {padded_line} ║")
+        rows.append(f"║ {padded_line} ║")
+    rows.append("╚" + "═" * box_width + "╝")
+    return "\n".join(rows) + "\n"
+
 
-    bottom_border = "╚" + "═" * box_width + "╝"
-    print(bottom_border)
+def create_box(content: str, title: str = "", width: int = 60) -> None:
+    """
+    Create a bordered box around content with optional title.
+    
+    Args:
+        content: The text content to display inside the box
+        title: Optional title to display in the top border
+        width: Minimum width of the box (default: 60)
+    """
+    sys.stdout.write(render_box(content, title, width))
 
 
-def show_spinner(message: str = "Loading", duration: float = 2) -> None:
+def show_spinner(message: str = "Loading", duration: float = 2) -> threading.Thread:
     """
     Display a simple spinner with visual feedback for the specified duration.
+
+    The animation runs on a daemon thread, so the caller can prepare work
+    meanwhile; join() it before anything else writes to the terminal, since
+    every frame erases the current line. Right before a Modal .remote()
+    call, use show_status instead.
     
     Args:
         message: Message to display alongside the spinner
         duration: How long to show the spinner in seconds (default: 2)
+
+    Returns:
+        threading.Thread: The animation thread; join() it to wait for the spinner
+    """
+    # Build every frame up front; each starts by erasing the line (ANSI EL),
+    # so no frame needs padding whatever the message length
+    frames = [f"\r{ERASE_LINE}{char} {message}..." for char in SPINNER_CHARS]
+    # A fixed frame count replaces re-reading the clock on every frame
+    frame_count = max(1, round(duration / SPINNER_INTERVAL))
+    write, flush = sys.stdout.write, sys.stdout.flush
+
+    def animate():
+        for i in range(frame_count):
+            write(frames[i % len(frames)])
+            flush()
+            time.sleep(SPINNER_INTERVAL)
+
+        # Clear the spinner line
+        write(f"\r{ERASE_LINE}")
+        flush()
+
+    spinner = threading.Thread(target=animate, daemon=True)
+    spinner.start()
+    return spinner
+
+
+def show_status(message: str) -> None:
     """
-    spinner_chars = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
-    start_time = time.time()
-    i = 0
+    Print a one-line status message without animation.
 
-    while time.time() - start_time < duration:
-        char = spinner_chars[i % len(spinner_chars)]
-        spinner_text = f"{char} {message}..."
-        print(f"\r{spinner_text}", end="", flush=True)
-        time.sleep(0.1)
-        i += 1
+    Used right before a Modal .remote() call: the call starts immediately
+    and streams container logs, which a spinner would either delay or
+    keep erasing.
 
-    # Clear the spinner line
-    clear_length = len(message) + 10
-    print(f"\r{' ' * clear_length}\r", end="", flush=True)
+    Args:
+        message: Message to display
+    """
+    sys.stdout.write(f"⏳ {message}...\n")
+    sys.stdout.flush()
 
 
 def create_info_box(message: str, title: str = "ℹ️ INFO") -> None:
@@ -124,4 +178,5 @@ def clear_line() -> None:
     """
     Clear the current terminal line and move cursor to beginning.
     """
-    print("\r" + " " * 80 + "\r", end="", flush=True)
\ No newline at end of file
+    sys.stdout.write(f"\r{ERASE_LINE}")
+    sys.stdout.flush()
\ No newline at end of file
@@ -7,8 +7,18 @@ common utility functions used across the DevBox application.
 Author: GoodieHART
 """
 
+import functools
 import os
-import platform
+import re
+import stat
+import sys
+
+from config import devbox_debug_enabled
+
+# sshd_config lines reported by inject_ssh_key
+SSHD_AUTH_SETTINGS = re.compile(
+    r"^(?:PubkeyAuthentication|PasswordAuthentication|PermitRootLogin)\b.*$", re.M
+)
 
 
 def get_system_info():
@@ -25,148 +35,212 @@ def get_system_info():
         return "CPU: Unknown"
 
 
-def display_system_info():
+@functools.lru_cache(maxsize=None)
+def get_system_info_text():
     """
-    Display system specs in a formatted box.
+    Get the system specs text shown by display_system_info.
+
+    The local system does not change while the launcher runs, so this is
+    built once. platform is imported here because the containers import
+    this module without ever displaying it.
+
+    Returns:
+        str: Multi-line system specs
     """
-    info = get_system_info()
-    system_box = f"""
+    import platform
+
+    return f"""
  🖥️  Local System:
-{info}
+{get_system_info()}
  🐍 Python: {platform.python_version()}
  💻 Platform: {platform.system()} {platform.release()}
 """
+
+
+def display_system_info():
+    """
+    Display system specs in a formatted box.
+    """
     # Import here to avoid circular dependency
     from ui_utils import create_box
-    create_box(system_box, "🖥️  SYSTEM SPECS")
+    create_box(get_system_info_text(), "🖥️  SYSTEM SPECS")
 
 
-def inject_ssh_key():
+def _ensure_pubkey(auth_keys_file, pubkey):
     """
-    Inject SSH public key from Modal Secret into authorized_keys.
-    Includes debugging output and ensures proper permissions.
+    Make sure pubkey is listed exactly once in an authorized_keys file.
+
+    The file is read once and left untouched when the key is already present.
+    A missing key is appended in place with a single O_APPEND write. Only a
+    file holding duplicate lines is rewritten, via a temporary file renamed
+    into place so an interrupted launch never leaves a torn file.
+
+    Args:
+        auth_keys_file: Path to the authorized_keys file
+        pubkey: Public key line to add
+
+    Returns:
+        bool: True if the file was changed
     """
-    import os
-    import sys
-    import subprocess
-    import pwd
+    # Keys are ASCII, so compare raw bytes rather than decoding the file
+    pubkey = pubkey.encode()
+    try:
+        with open(auth_keys_file, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = b""
+    lines = [line.strip() for line in data.splitlines()]
+    # Ordered de-duplication; exact per-line match, so a key prefix doesn't count
+    keys = dict.fromkeys(line for line in lines if line)
+    if len(keys) == len(lines):
+        if pubkey in keys:
+            return False
+        fd = os.open(auth_keys_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            separator = b"\n" if data and not data.endswith(b"\n") else b""
+            os.write(fd, separator + pubkey + b"\n")
+        finally:
+            os.close(fd)
+        return True
+    keys[pubkey] = None
+    tmp_file = auth_keys_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(b"\n".join(keys) + b"\n")
+    os.chmod(tmp_file, 0o600)
+    os.replace(tmp_file, auth_keys_file)
+    return True
 
-    print("="*60, file=sys.stderr)
-    print("🔐 SSH KEY INJECTION DIAGNOSTICS", file=sys.stderr)
-    print("="*60, file=sys.stderr)
 
+def inject_ssh_key():
+    """
+    Inject SSH public key from Modal Secret into authorized_keys.
+    Ensures proper permissions; with DEVBOX_DEBUG=1 set in the container it
+    also reports ownership, permissions and the sshd auth settings.
+    """
     # Ensure .ssh directory exists with proper permissions
     ssh_dir = "/root/.ssh"
     auth_keys_file = f"{ssh_dir}/authorized_keys"
 
+    debug = devbox_debug_enabled()
+
+    # Diagnostics are collected and written with a single call at the end;
+    # errors are always shown, the rest only when debugging
+    report = ["="*60, "🔐 SSH KEY INJECTION DIAGNOSTICS", "="*60]
+    log = report.append
+
+    def flush(show=debug):
+        if show:
+            log("="*60)
+            sys.stderr.write("\n".join(report) + "\n")
+
     try:
-        # Check who we are running as
-        current_user = pwd.getpwuid(os.getuid()).pw_name
-        print(f"👤 Running as user: {current_user} (UID: {os.getuid()})", file=sys.stderr)
-
-        # Check environment variables
-        print("🔍 Environment variables:", file=sys.stderr)
-        for key in ['PUBKEY', 'HOME', 'USER']:
-            value = os.environ.get(key, 'NOT SET')
-            if key == 'PUBKEY':
-                # Show partial key for security
-                if value and len(value) > 20:
-                    print(f"  {key}: {value[:30]}... (length: {len(value)})", file=sys.stderr)
+        if debug:
+            import pwd
+
+            # Check who we are running as
+            current_user = pwd.getpwuid(os.getuid()).pw_name
+            log(f"👤 Running as user: {current_user} (UID: {os.getuid()})")
+
+            # Check environment variables
+            log("🔍 Environment variables:")
+            for key in ['PUBKEY', 'HOME', 'USER']:
+                value = os.environ.get(key, 'NOT SET')
+                if key == 'PUBKEY':
+                    # Show partial key for security
+                    if value and len(value) > 20:
+                        log(f"  {key}: {value[:30]}... (length: {len(value)})")
+                    else:
+                        log(f"  {key}: {value[:30] if value else 'EMPTY OR NOT SET'} ⚠️")
                 else:
-                    print(f"  {key}: {value[:30] if value else 'EMPTY OR NOT SET'} ⚠️", file=sys.stderr)
-            else:
-                print(f"  {key}: {value}", file=sys.stderr)
+                    log(f"  {key}: {value}")
 
         # Get pubkey from environment - THIS IS THE CRITICAL PART
         pubkey = os.environ.get("PUBKEY", "").strip()
         
         if not pubkey:
-            print("\n❌ CRITICAL ERROR: PUBKEY environment variable is EMPTY!", file=sys.stderr)
-            print("❌ SSH authentication WILL FAIL!", file=sys.stderr)
-            print("❌ Check: modal secret list | grep ssh", file=sys.stderr)
-            print("❌ Check: modal secret create ssh-public-key PUBKEY=\"$(cat ~/.ssh/id_ed25519.pub)\"", file=sys.stderr)
-            print("="*60, file=sys.stderr)
+            log("\n❌ CRITICAL ERROR: PUBKEY environment variable is EMPTY!")
+            log("❌ SSH authentication WILL FAIL!")
+            log("❌ Check: modal secret list | grep ssh")
+            log("❌ Check: modal secret create ssh-public-key PUBKEY=\"$(cat ~/.ssh/id_ed25519.pub)\"")
+            flush(show=True)
             return False
 
-        print(f"\n✓ Found PUBKEY (length: {len(pubkey)} chars)", file=sys.stderr)
+        log(f"\n✓ Found PUBKEY (length: {len(pubkey)} chars)")
 
         # Ensure .ssh directory exists
         os.makedirs(ssh_dir, mode=0o700, exist_ok=True)
         
         # Get current .ssh directory info
         ssh_stat = os.stat(ssh_dir)
-        ssh_owner = pwd.getpwuid(ssh_stat.st_uid).pw_name
-        ssh_perms = oct(ssh_stat.st_mode)[-3:]
-        print(f"📁 {ssh_dir} owner={ssh_owner}, perms={ssh_perms}", file=sys.stderr)
+        ssh_perms = f"{stat.S_IMODE(ssh_stat.st_mode):03o}"
+        if debug:
+            ssh_owner = pwd.getpwuid(ssh_stat.st_uid).pw_name
+            log(f"📁 {ssh_dir} owner={ssh_owner}, perms={ssh_perms}")
         
         if ssh_perms != "700":
-            print("  ⚠️ Fixing permissions to 700", file=sys.stderr)
+            log("  ⚠️ Fixing permissions to 700")
             os.chmod(ssh_dir, 0o700)
 
-        # Check if authorized_keys exists and get its current state
-        if os.path.exists(auth_keys_file):
-            auth_stat = os.stat(auth_keys_file)
-            auth_owner = pwd.getpwuid(auth_stat.st_uid).pw_name
-            auth_perms = oct(auth_stat.st_mode)[-3:]
-            with open(auth_keys_file, "r") as f:
-                existing_content = f.read().strip()
-            print(f"📄 {auth_keys_file} exists, owner={auth_owner}, perms={auth_perms}, size={len(existing_content)} bytes", file=sys.stderr)
-            
-            # Check if our key is already there
-            if pubkey in existing_content:
-                print("  ✓ Key already present in authorized_keys", file=sys.stderr)
+        # Report the current authorized_keys state before updating it
+        if debug:
+            if os.path.exists(auth_keys_file):
+                auth_stat = os.stat(auth_keys_file)
+                auth_owner = pwd.getpwuid(auth_stat.st_uid).pw_name
+                auth_perms = f"{stat.S_IMODE(auth_stat.st_mode):03o}"
+                log(f"📄 {auth_keys_file} exists, owner={auth_owner}, perms={auth_perms}, size={auth_stat.st_size} bytes")
             else:
-                print("  ⚠️ Key NOT in authorized_keys, will append", file=sys.stderr)
-        else:
-            print(f"📄 {auth_keys_file} does not exist, will create", file=sys.stderr)
-            existing_content = ""
+                log(f"📄 {auth_keys_file} does not exist, will create")
 
-        # Write the key
-        if pubkey not in existing_content:
-            with open(auth_keys_file, "a") as f:
-                f.write(pubkey + "\n")
-            print("✓ Appended key to authorized_keys", file=sys.stderr)
+        if _ensure_pubkey(auth_keys_file, pubkey):
+            status = "✓ Added key to authorized_keys"
+        else:
+            status = "✓ Key already present in authorized_keys"
+        log(status)
 
         # Set permissions (CRITICAL for SSH to work!)
         os.chmod(auth_keys_file, 0o600)
         
-        # Final verification
-        final_stat = os.stat(auth_keys_file)
-        final_perms = oct(final_stat.st_mode)[-3:]
-        final_owner = pwd.getpwuid(final_stat.st_uid).pw_name
-        
-        with open(auth_keys_file, "r") as f:
-            final_content = f.read()
-        
-        print("\n📊 FINAL STATE:", file=sys.stderr)
-        print(f"  File: {auth_keys_file}", file=sys.stderr)
-        print(f"  Owner: {final_owner}", file=sys.stderr)
-        print(f"  Permissions: {final_perms} (should be 600)", file=sys.stderr)
-        print(f"  Size: {len(final_content)} bytes", file=sys.stderr)
-        print(f"  Contains key: {pubkey in final_content}", file=sys.stderr)
-        
-        if final_perms != "600":
-            print(f"  ❌ WARNING: Permissions are {final_perms}, not 600!", file=sys.stderr)
-        
-        # Also check SSHD config
-        print("\n🔍 SSHD Configuration:", file=sys.stderr)
-        try:
-            result = subprocess.run(['grep', '-E', '^(PubkeyAuthentication|PasswordAuthentication|PermitRootLogin)', '/etc/ssh/sshd_config'], 
-                                  capture_output=True, text=True)
-            if result.stdout:
-                for line in result.stdout.strip().split('\n'):
-                    print(f"  {line}", file=sys.stderr)
-            else:
-                print("  ⚠️ No SSH auth settings found in sshd_config!", file=sys.stderr)
-        except Exception as e:
-            print(f"  ⚠️ Could not read sshd_config: {e}", file=sys.stderr)
-
-        print("="*60, file=sys.stderr)
+        if debug:
+            # Final verification
+            final_stat = os.stat(auth_keys_file)
+            final_perms = f"{stat.S_IMODE(final_stat.st_mode):03o}"
+            final_owner = pwd.getpwuid(final_stat.st_uid).pw_name
+            
+            # Debug only: re-read the file so the report shows what sshd will see
+            with open(auth_keys_file, "rb") as f:
+                contains_key = pubkey.encode() in (line.strip() for line in f)
+            log("\n📊 FINAL STATE:")
+            log(f"  File: {auth_keys_file}")
+            log(f"  Owner: {final_owner}")
+            log(f"  Permissions: {final_perms} (should be 600)")
+            log(f"  Size: {final_stat.st_size} bytes")
+            log(f"  Contains key: {contains_key}")
+            if not contains_key:
+                log("  ❌ WARNING: Key is missing from authorized_keys!")
+            
+            if final_perms != "600":
+                log(f"  ❌ WARNING: Permissions are {final_perms}, not 600!")
+            
+            # Also check SSHD config
+            log("\n🔍 SSHD Configuration:")
+            try:
+                with open('/etc/ssh/sshd_config') as f:
+                    settings = SSHD_AUTH_SETTINGS.findall(f.read())
+                if settings:
+                    for line in settings:
+                        log(f"  {line}")
+                else:
+                    log("  ⚠️ No SSH auth settings found in sshd_config!")
+            except Exception as e:
+                log(f"  ⚠️ Could not read sshd_config: {e}")
+            flush()
+        else:
+            print(f"🔐 {status}", file=sys.stderr)
         return True
 
     except Exception as e:
-        print(f"\n❌ EXCEPTION during SSH key injection: {e}", file=sys.stderr)
         import traceback
-        traceback.print_exc(file=sys.stderr)
-        print("="*60, file=sys.stderr)
-        return False
\ No newline at end of file
+        log(f"\n❌ EXCEPTION during SSH key injection: {e}")
+        log(traceback.format_exc().rstrip())
+        flush(show=True)
+        return False